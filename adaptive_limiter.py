@@ -0,0 +1,166 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Caps the request rate. Holds up to `burst` tokens and refills `rate` tokens per second.
+
+    Args:
+        rate (float): Tokens added per second.
+        burst (int): Maximum number of tokens in the bucket.
+    """
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, wait_check=None):
+        """
+        Takes a token, waiting until one is available.
+
+        Args:
+            wait_check (callable): Optional, called while waiting. It may raise to stop waiting.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self._burst, self._tokens + (now - self._last_refill) * self._rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self._rate
+            if wait_check:
+                wait_check()
+            time.sleep(min(wait_time, 0.2))
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD (additive increase, multiplicative decrease) limit on the number of requests in flight to one backend.
+
+    While the latency stays close to the usual latency of requests of the same size, the limit grows by about one
+    per round of requests. An error or a latency spike halves it, at most once per round, so the backend settles at the
+    highest throughput it can take without timing out. An optional token bucket caps the request rate.
+
+    Args:
+        initial_limit (int): The limit to start with.
+        min_limit (int): The limit never goes below this.
+        max_limit (int): The limit never goes above this.
+        latency_tolerance (float): A latency above baseline * latency_tolerance counts as a spike.
+        rate (float): Optional, maximum requests per second.
+        burst (int): Size of the token bucket, defaults to the rate.
+        min_decrease_interval (float): Seconds between two cuts at least, when fast errors make a round shorter.
+    """
+
+    def __init__(self, initial_limit, min_limit=1, max_limit=16, latency_tolerance=2.0, rate=None, burst=None,
+                 min_decrease_interval=1.0):
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._latency_tolerance = latency_tolerance
+        self._min_decrease_interval = min_decrease_interval
+        self._token_bucket = TokenBucket(rate, burst or max(1, int(rate))) if rate else None
+        self._rate = rate
+
+        self._in_flight = 0
+        # Smoothed latency per request size bucket (powers of two in characters), short and long requests
+        # take very different times and must not be compared with each other
+        self._baseline_latencies = {}
+        self._last_latency = None
+        self._last_decrease_time = 0.0
+        self._successes = 0
+        self._failures = 0
+        self._condition = threading.Condition()
+
+    def get_limit(self):
+        with self._condition:
+            return int(self._limit)
+
+    def get_max_limit(self):
+        return self._max_limit
+
+    def acquire(self, wait_check=None):
+        """
+        Waits for a free slot under the current limit (and a token, if the rate is capped).
+
+        Args:
+            wait_check (callable): Optional, called while waiting without holding any lock. It may block
+                or raise to stop waiting.
+        """
+        while True:
+            with self._condition:
+                if self._in_flight < int(self._limit):
+                    self._in_flight += 1
+                    break
+                self._condition.wait(0.2)
+            # Outside the lock, a paused job blocks here and must not stall the other jobs on this backend
+            if wait_check:
+                wait_check()
+        if self._token_bucket:
+            try:
+                self._token_bucket.acquire(wait_check)
+            except BaseException:
+                self.release(None, True)
+                raise
+
+    def release(self, latency, success, size=0):
+        """
+        Frees a slot and adjusts the limit to the outcome of the request.
+
+        Args:
+            latency (float): Duration of the request in seconds, or None if it wasn't sent.
+            success (bool): False if the request failed in a way that points to an overloaded backend.
+            size (int): Size of the request in characters, the latency is only compared with requests of a similar size.
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if latency is not None:
+                self._last_latency = latency
+                size_bucket = max(0, int(size)).bit_length()
+                baseline = self._baseline_latencies.get(size_bucket)
+                spike = success and baseline is not None and latency > baseline * self._latency_tolerance
+                if success:
+                    self._successes += 1
+                    if baseline is None:
+                        self._baseline_latencies[size_bucket] = latency
+                    else:
+                        # Follow faster responses quicker than slower ones, a single fast response doesn't reset it
+                        weight = 0.3 if latency < baseline else 0.05
+                        self._baseline_latencies[size_bucket] = baseline + weight * (latency - baseline)
+                else:
+                    self._failures += 1
+
+                if success and not spike:
+                    self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+                else:
+                    now = time.monotonic()
+                    # One cut per round of requests, the requests of the same round saw the same overload. A round
+                    # lasts as long as a normal request, not as the failed one: a 503 comes back right away.
+                    round_time = max(latency, baseline or max(self._baseline_latencies.values(), default=0.0),
+                                     self._min_decrease_interval)
+                    if now - self._last_decrease_time > round_time:
+                        self._limit = max(self._min_limit, self._limit / 2)
+                        self._last_decrease_time = now
+            self._condition.notify_all()
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: The current limit, requests in flight, latencies (baselines keyed by the upper bound of the
+            request size in characters) and request counters.
+        """
+        with self._condition:
+            return {
+                "limit": int(self._limit),
+                "max_limit": self._max_limit,
+                "in_flight": self._in_flight,
+                "rate": self._rate,
+                "baseline_latencies": {2 ** bucket: latency
+                                       for bucket, latency in sorted(self._baseline_latencies.items())},
+                "last_latency": self._last_latency,
+                "successes": self._successes,
+                "failures": self._failures,
+            }
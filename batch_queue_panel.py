@@ -0,0 +1,353 @@
+import os
+
+from PyQt5.QtCore import Qt, QThread, QTimer
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QTableWidgetItem,
+    QHeaderView,
+    QProgressBar,
+    QFileDialog,
+    QAbstractItemView
+)
+
+from translation_payload import TranslationPayload
+from translation_worker import TranslationWorker
+from subtitle_writer import BulkWriter
+
+class BatchQueuePanel(QWidget):
+    """
+    Queue of subtitle files that are translated in the background, a configurable number at a time.
+    Files can be added with the buttons or dropped onto the panel, dropped folders are searched for
+    subtitle files. All jobs share the translator's HTTP session.
+
+    Args:
+        settings_provider (callable): Returns (source_lang, target_lang, output_dir, incremental, profile) for the queue
+            or None if the settings are not valid. An empty output_dir means "next to the source file".
+        parent (QWidget): The parent widget.
+    """
+
+    # Extensions picked up when a folder is added
+    SUBTITLE_EXTENSIONS = (".srt", ".txt")
+
+    # Longest time a finished job's output waits in memory while other jobs are still running
+    FLUSH_DELAY_MS = 5000
+
+    # Table columns
+    FILE_COLUMN = 0
+    STATUS_COLUMN = 1
+    PROGRESS_COLUMN = 2
+
+    def __init__(self, settings_provider, parent=None):
+        super().__init__(parent)
+        self._settings_provider = settings_provider
+        # Row data: file path, output path, status and (thread, worker) while the job runs
+        self._jobs = []
+        self._queue_running = False
+        self._settings = None
+        # Outputs of a queue run are written in bulk, flushed a little after a job finishes and when the run ends
+        self._bulk_writer = None
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self.write_pending_outputs)
+
+        self.setAcceptDrops(True)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        # Adding files
+        add_layout = QHBoxLayout()
+        self._add_files_button = QPushButton("Add Files")
+        self._add_files_button.clicked.connect(self.on_add_files_button_clicked)
+        self._add_folder_button = QPushButton("Add Folder")
+        self._add_folder_button.clicked.connect(self.on_add_folder_button_clicked)
+        self._clear_button = QPushButton("Clear Finished")
+        self._clear_button.clicked.connect(self.on_clear_button_clicked)
+        add_layout.addWidget(self._add_files_button)
+        add_layout.addWidget(self._add_folder_button)
+        add_layout.addWidget(self._clear_button)
+        layout.addLayout(add_layout)
+
+        # Queue table
+        self._table = QTableWidget(0, 3)
+        self._table.setHorizontalHeaderLabels(["File", "Status", "Progress"])
+        self._table.horizontalHeader().setSectionResizeMode(self.FILE_COLUMN, QHeaderView.Stretch)
+        self._table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self._table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        layout.addWidget(self._table)
+
+        # Queue controls
+        control_layout = QHBoxLayout()
+        self._parallel_label = QLabel("Parallel jobs:")
+        self._parallel_spinbox = QSpinBox()
+        self._parallel_spinbox.setRange(1, 8)
+        self._parallel_spinbox.setValue(2)
+        self._start_button = QPushButton("Start Queue")
+        self._start_button.clicked.connect(self.on_start_button_clicked)
+        self._cancel_button = QPushButton("Cancel Queue")
+        self._cancel_button.setEnabled(False)
+        self._cancel_button.clicked.connect(self.on_cancel_button_clicked)
+        control_layout.addWidget(self._parallel_label)
+        control_layout.addWidget(self._parallel_spinbox)
+        control_layout.addWidget(self._start_button)
+        control_layout.addWidget(self._cancel_button)
+        layout.addLayout(control_layout)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        self.add_paths(paths)
+        event.acceptProposedAction()
+
+    def on_add_files_button_clicked(self):
+        default_path = os.path.join(os.path.expanduser("~"), "Documents")
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Subtitle Files", default_path)
+        self.add_paths(file_paths)
+
+    def on_add_folder_button_clicked(self):
+        default_path = os.path.join(os.path.expanduser("~"), "Documents")
+        dir_path = QFileDialog.getExistingDirectory(self, "Select Folder", default_path)
+        if dir_path:
+            self.add_paths([dir_path])
+
+    def on_clear_button_clicked(self):
+        """
+        Removes finished, cancelled and failed rows from the queue.
+        """
+        for row in reversed(range(len(self._jobs))):
+            if self._jobs[row]["status"] in ("Done", "Cancelled", "Failed"):
+                self._table.removeRow(row)
+                del self._jobs[row]
+
+    def add_paths(self, paths):
+        """
+        Adds subtitle files to the queue. Folders are searched recursively for subtitle files, other
+        files and files that are already queued are skipped.
+
+        Args:
+            paths (list): File and folder paths.
+        """
+        queued = {job["path"] for job in self._jobs}
+        for path in paths:
+            if os.path.isdir(path):
+                file_paths = []
+                for root, _, file_names in os.walk(path):
+                    file_paths.extend(os.path.join(root, file_name) for file_name in sorted(file_names)
+                                      if file_name.lower().endswith(self.SUBTITLE_EXTENSIONS))
+            elif path.lower().endswith(self.SUBTITLE_EXTENSIONS):
+                file_paths = [path]
+            else:
+                print(f"Skipping {path}, not a subtitle file.")
+                continue
+
+            for file_path in file_paths:
+                if file_path not in queued:
+                    queued.add(file_path)
+                    self.add_job(file_path)
+
+        # Files added while the queue runs are picked up as soon as a slot is free
+        if self._queue_running:
+            self.start_next_jobs()
+
+    def add_job(self, file_path):
+        row = self._table.rowCount()
+        self._table.insertRow(row)
+        self._table.setItem(row, self.FILE_COLUMN, QTableWidgetItem(file_path))
+        self._table.setItem(row, self.STATUS_COLUMN, QTableWidgetItem("Queued"))
+        progress_bar = QProgressBar()
+        progress_bar.setAlignment(Qt.AlignCenter)
+        self._table.setCellWidget(row, self.PROGRESS_COLUMN, progress_bar)
+        self._jobs.append({"path": file_path, "output_path": None, "status": "Queued", "thread": None, "worker": None})
+
+    def set_job_status(self, job, status):
+        job["status"] = status
+        row = self._jobs.index(job)
+        self._table.item(row, self.STATUS_COLUMN).setText(status)
+
+    def on_start_button_clicked(self):
+        self._settings = self._settings_provider()
+        if self._settings is None:
+            return
+        self._queue_running = True
+        self._bulk_writer = BulkWriter()
+        self._start_button.setEnabled(False)
+        self._cancel_button.setEnabled(True)
+        self.start_next_jobs()
+
+    def on_cancel_button_clicked(self):
+        self.cancel_all()
+
+    def running_jobs(self):
+        return [job for job in self._jobs if job["status"] == "Translating"]
+
+    def start_next_jobs(self):
+        """
+        Starts queued jobs until the configured number of jobs is running.
+        Stops the queue when nothing is left to run.
+        """
+        free_slots = self._parallel_spinbox.value() - len(self.running_jobs())
+        for job in self._jobs:
+            if free_slots <= 0:
+                break
+            if job["status"] == "Queued":
+                self.start_job(job)
+                free_slots -= 1
+
+        if not self.running_jobs():
+            self._queue_running = False
+            self.finish_queue()
+
+    def finish_queue(self):
+        """
+        Writes the pending outputs once no job is running anymore and lets the queue be started again.
+        """
+        self.flush_outputs()
+        self._start_button.setEnabled(True)
+        self._cancel_button.setEnabled(False)
+
+    def flush_outputs(self):
+        """
+        Writes the outputs of the queue run that are still pending and marks their rows as done, or as
+        failed if the file could not be written.
+        """
+        self._flush_timer.stop()
+        self.write_pending_outputs()
+        self._bulk_writer = None
+
+    def write_pending_outputs(self):
+        """
+        Writes the outputs that are still pending, while the queue runs or when it ends, and updates their rows.
+        """
+        if self._bulk_writer is None:
+            return
+        try:
+            self._bulk_writer.flush()
+        except OSError as e:
+            print(f"Error writing translated files: {e}")
+        for job in self._jobs:
+            if job["status"] == "Writing":
+                self.update_written_job(job)
+
+    def update_written_job(self, job):
+        """
+        Marks a translated job as done once its output is on disk, or as failed if writing it failed.
+        Jobs whose output is still queued stay in the "Writing" state until the next flush.
+        """
+        if self._bulk_writer and self._bulk_writer.is_pending(job["output_path"]):
+            self.set_job_status(job, "Writing")
+            return
+        error = self._bulk_writer.get_error(job["output_path"]) if self._bulk_writer else None
+        if error:
+            self._table.item(self._jobs.index(job), self.STATUS_COLUMN).setToolTip(f"Could not write the file: {error}")
+            self.set_job_status(job, "Failed")
+        else:
+            self.set_job_progress(job, 100)
+            self.set_job_status(job, "Done")
+
+    def start_job(self, job):
+        # Imported here to avoid a circular import, gui.py imports this panel
+        from gui import PathHandler
+
+        source_lang, target_lang, output_dir, incremental, profile = self._settings
+        if not output_dir:
+            output_dir = os.path.dirname(job["path"])
+        output_path = PathHandler.create_output_path(job["path"], output_dir, target_lang)
+        payload = TranslationPayload(job["path"], output_path, source_lang, target_lang, incremental)
+
+        thread = QThread()
+        worker = TranslationWorker(payload, self._bulk_writer, profile)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        # Bound methods, so the slots run on the GUI thread. The job is looked up from the sender.
+        worker.progress.connect(self.on_job_progress)
+        worker.finished.connect(self.on_job_finished)
+        worker.cancelled.connect(self.on_job_cancelled)
+        worker.failed.connect(self.on_job_failed)
+        for signal in (worker.finished, worker.cancelled, worker.failed):
+            signal.connect(thread.quit)
+            signal.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+
+        job["output_path"] = output_path
+        job["thread"] = thread
+        job["worker"] = worker
+        self.set_job_status(job, "Translating")
+        thread.start()
+
+    def job_for_worker(self, worker):
+        for job in self._jobs:
+            if job["worker"] is worker:
+                return job
+        return None
+
+    def set_job_progress(self, job, percent):
+        row = self._jobs.index(job)
+        self._table.cellWidget(row, self.PROGRESS_COLUMN).setValue(percent)
+
+    def on_job_progress(self, chars_done, total_chars, chunks_done, total_chunks, throughput, eta):
+        job = self.job_for_worker(self.sender())
+        if job and total_chars > 0:
+            self.set_job_progress(job, chars_done * 100 // total_chars)
+
+    def on_job_finished(self):
+        job = self.job_for_worker(self.sender())
+        if job:
+            self.update_written_job(job)
+            if job["status"] == "Writing" and not self._flush_timer.isActive():
+                # Don't keep finished work in memory until the whole queue is done
+                self._flush_timer.start(self.FLUSH_DELAY_MS)
+            self.on_job_ended(job, job["status"])
+
+    def on_job_cancelled(self):
+        job = self.job_for_worker(self.sender())
+        if job:
+            self.on_job_ended(job, "Cancelled")
+
+    def on_job_failed(self, error):
+        job = self.job_for_worker(self.sender())
+        if job:
+            self._table.item(self._jobs.index(job), self.STATUS_COLUMN).setToolTip(error)
+            self.on_job_ended(job, "Failed")
+
+    def on_job_ended(self, job, status):
+        job["worker"] = None
+        job["thread"] = None
+        self.set_job_status(job, status)
+        if self._queue_running:
+            self.start_next_jobs()
+        elif not self.running_jobs():
+            # The queue was cancelled, its outputs are written once the last running job has stopped
+            self.finish_queue()
+
+    def cancel_all(self, wait=False):
+        """
+        Cancels the running jobs and the ones still waiting in the queue.
+
+        Args:
+            wait (bool): Block until the running jobs have stopped, used when the application closes.
+        """
+        self._queue_running = False
+        for job in self._jobs:
+            if job["status"] == "Queued":
+                self.set_job_status(job, "Cancelled")
+        running_jobs = self.running_jobs()
+        for job in running_jobs:
+            job["worker"].cancel()
+        self._cancel_button.setEnabled(False)
+        if wait:
+            for job in running_jobs:
+                job["thread"].quit()
+                job["thread"].wait(5000)
+        # Jobs that finished before the cancellation keep their output. Running jobs can still queue
+        # theirs until they stop, so the flush waits for the last one of them (see on_job_ended).
+        if wait or not running_jobs:
+            self.finish_queue()
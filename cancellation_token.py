@@ -0,0 +1,46 @@
+import threading
+
+class TranslationCancelled(Exception):
+    """
+    Raised at a checkpoint once the translation job has been cancelled.
+    """
+
+class CancellationToken:
+    """
+    Lets the GUI cancel, pause and resume a running translation job. The translator checks the token
+    between chunks and before every request, so the job stops at the next checkpoint and chunks that
+    were already translated are kept while paused.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._resumed = threading.Event()
+        self._resumed.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        # Wake up paused workers so they can see the cancellation
+        self._resumed.set()
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def is_paused(self):
+        return not self._resumed.is_set()
+
+    def checkpoint(self):
+        """
+        Blocks while the job is paused and raises if it has been cancelled.
+
+        Raises:
+            TranslationCancelled: If cancel() has been called.
+        """
+        self._resumed.wait()
+        if self._cancelled.is_set():
+            raise TranslationCancelled()
@@ -4,6 +4,7 @@ import time
 import subprocess
 import platform
 import requests
+from urllib.parse import quote
 
 class DockerChecker:
 
@@ -215,4 +216,46 @@ class DockerChecker:
             time.sleep(5)  # Sleep time before retrying
 
         print("Service failed to start within the timeout period.")
-        return False
\ No newline at end of file
+        return False
+
+    @staticmethod
+    def warm_up_service(url, language_pairs, attempts=5, sample_text="Hello, how are you?"):
+        """
+        Sends a small warm-up translation for every language pair so Lingva's cold start is paid
+        before the first real chunk goes out. /api answering 200 does not mean translations are fast yet.
+
+        Args:
+            url (str): Base url of the translation API (e.g., 'http://localhost:3000/api').
+            language_pairs (list): A list of (source_lang, target_lang) code tuples to warm up.
+            attempts (int): How many times each pair is retried before giving up on it.
+            sample_text (str): The text sent for the warm-up translation.
+
+        Returns:
+            float: The baseline latency in seconds (the slowest warmed-up pair), or None if no pair
+            could be translated.
+        """
+        latencies = []
+        # The text is part of the path, a '?' or '/' in it would change the request
+        quoted_text = quote(sample_text, safe="")
+        for source_lang, target_lang in language_pairs:
+            print(f"Warming up {source_lang} -> {target_lang}...")
+            for attempt in range(1, attempts + 1):
+                try:
+                    # The first request absorbs the cold start, the second one is the real measurement
+                    requests.get(f"{url}/v1/{source_lang}/{target_lang}/{quoted_text}", timeout=30)
+                    start_time = time.time()
+                    response = requests.get(f"{url}/v1/{source_lang}/{target_lang}/{quoted_text}", timeout=30)
+                    latency = time.time() - start_time
+                    if response.status_code == 200 and "translation" in response.json():
+                        print(f"Warm-up {source_lang} -> {target_lang} done in {latency:.2f}s")
+                        latencies.append(latency)
+                        break
+                    print(f"Warm-up responded with status {response.status_code}, retrying... ({attempt}/{attempts})")
+                except (requests.ConnectionError, requests.Timeout, ValueError):
+                    print(f"Warm-up request failed, retrying... ({attempt}/{attempts})")
+                time.sleep(2)  # Give the service a moment before retrying
+
+        if not latencies:
+            print("Translation service did not answer any warm-up translation.")
+            return None
+        return max(latencies)
@@ -16,11 +16,15 @@ from PyQt5.QtWidgets import (
     QVBoxLayout,
     QWidget,
     QHBoxLayout, QSizePolicy,
-    QMessageBox, QProgressBar
+    QMessageBox, QProgressBar,
+    QGroupBox, QCheckBox
 )
 
 from translation_payload import TranslationPayload
 from translation_worker import TranslationWorker
+from batch_queue_panel import BatchQueuePanel
+from language_registry import LanguageRegistry, UnsupportedLanguageError
+from language_detector import LanguageDetector
 
 class SubtitleTranslatorGUI(QMainWindow):
 
@@ -58,7 +62,7 @@ class SubtitleTranslatorGUI(QMainWindow):
         super().__init__()
 
         self.setWindowTitle("QuickSub")
-        self.setGeometry(100, 100, 600, 250)
+        self.setGeometry(100, 100, 700, 600)
         self.setWindowIcon(QIcon("resources/app_icon.png"))
 
         # Main widget
@@ -104,13 +108,16 @@ class SubtitleTranslatorGUI(QMainWindow):
         lang_layout = QHBoxLayout()
         self._source_label = QLabel("Source Language:")
         self._source_dropdown = QComboBox()
-        self._source_dropdown.addItems(["(empty)", "English", "Serbian"])
+        # Languages supported by the translation service
+        language_registry = LanguageRegistry.get_instance()
+        self._source_dropdown.addItems(["(empty)", LanguageDetector.AUTO_DETECT_NAME]
+                                       + language_registry.get_source_languages())
         # Connecting dropdown signal
         self._source_dropdown.currentIndexChanged.connect(self.on_source_language_changed)
 
         self._target_label = QLabel("Target Language:")
         self._target_dropdown = QComboBox()
-        self._target_dropdown.addItems(["(empty)", "English", "Српски"])
+        self._target_dropdown.addItems(["(empty)"] + language_registry.get_target_languages())
         # Connecting dropdown signal
         self._target_dropdown.currentIndexChanged.connect(self.on_target_language_changed)
 
@@ -120,18 +127,53 @@ class SubtitleTranslatorGUI(QMainWindow):
         lang_layout.addWidget(self._target_dropdown)
         main_layout.addLayout(lang_layout)
 
+        # Incremental mode, reuses the previous translation of cues that didn't change
+        self._incremental_checkbox = QCheckBox("Only re-translate changed lines (reuse the previous translation)")
+        main_layout.addWidget(self._incremental_checkbox)
+
+        # Profiling, writes where the time went next to the translated file (for performance bug reports)
+        self._profile_checkbox = QCheckBox("Write a profile report next to the translated file")
+        main_layout.addWidget(self._profile_checkbox)
+
         # Translate button
         self._translate_button = QPushButton("Translate")
         self._translate_button.clicked.connect(self.on_translate_button_clicked)
         main_layout.addWidget(self._translate_button)
 
+        # Pause/Resume and Cancel the running translation
+        job_layout = QHBoxLayout()
+        self._pause_button = QPushButton("Pause")
+        self._pause_button.setEnabled(False)
+        self._pause_button.clicked.connect(self.on_pause_button_clicked)
+        self._cancel_button = QPushButton("Cancel")
+        self._cancel_button.setEnabled(False)
+        self._cancel_button.clicked.connect(self.on_cancel_button_clicked)
+        job_layout.addWidget(self._pause_button)
+        job_layout.addWidget(self._cancel_button)
+        main_layout.addLayout(job_layout)
+
         # Progress bar
         self._progress_bar = QProgressBar(self)
         self._progress_bar.setAlignment(Qt.AlignCenter)
         main_layout.addWidget(self._progress_bar)
 
+        # Chunks, throughput and ETA of the running translation
+        self._progress_label = QLabel("")
+        self._progress_label.setAlignment(Qt.AlignCenter)
+        main_layout.addWidget(self._progress_label)
+
+        # Batch queue, translates many files using the languages and target directory chosen above
+        batch_group = QGroupBox("Batch Queue")
+        batch_layout = QVBoxLayout()
+        batch_group.setLayout(batch_layout)
+        self._batch_queue_panel = BatchQueuePanel(self.get_batch_settings)
+        batch_layout.addWidget(self._batch_queue_panel)
+        main_layout.addWidget(batch_group)
+
         # creating a flag for finished translations
         self._translation_finished = False
+        # flag for a translation that is currently running
+        self._translation_running = False
 
     def on_file_browse_button_clicked(self):
         """
@@ -164,6 +206,44 @@ class SubtitleTranslatorGUI(QMainWindow):
     def on_target_language_changed(self):
         self._target_lang = self._target_dropdown.currentText()
 
+    def validate_languages(self, source_lang, target_lang):
+        """
+        Checks the selected languages and tells the user what is wrong with them.
+
+        Returns:
+            bool: True if a translation can be started with these languages.
+        """
+        if source_lang == "" or target_lang == "":
+            self.show_message_box("You have to set both source and target language.", title="Missing Language", message_type="warning")
+        elif source_lang == "(empty)" or target_lang == "(empty)":
+            self.show_message_box("Source and target languages cannot be (empty).", title="Invalid Language", message_type="warning")
+        elif source_lang == target_lang:
+            self.show_message_box("Source and target language are same. No need for translation.", title="No need for translation",
+                                  message_type="warning")
+        else:
+            language_registry = LanguageRegistry.get_instance()
+            source_code = LanguageDetector.AUTO if source_lang == LanguageDetector.AUTO_DETECT_NAME \
+                else language_registry.get_code(source_lang)
+            try:
+                language_registry.validate_pair(source_code, language_registry.get_code(target_lang))
+                return True
+            except UnsupportedLanguageError as e:
+                self.show_message_box(str(e), title="Unsupported Language", message_type="warning")
+        return False
+
+    def get_batch_settings(self):
+        """
+        Provides the settings of the batch queue. Translated files go to the selected target
+        directory, or next to their source file if none is selected.
+
+        Returns:
+            tuple: (source_lang, target_lang, output_dir, incremental, profile), or None if the languages are not valid.
+        """
+        if not self.validate_languages(self._source_lang, self._target_lang):
+            return None
+        return (self._source_lang, self._target_lang, self._dir_input.text(), self._incremental_checkbox.isChecked(),
+                self._profile_checkbox.isChecked())
+
     def on_translate_button_clicked(self, translation_ready=False):
         """
         Handles the action when the 'Translate' button is clicked.
@@ -185,21 +265,15 @@ class SubtitleTranslatorGUI(QMainWindow):
         dir_input = PathHandler.create_output_path(file_input, dir_input,target_lang)
 
         if self._translation_finished is False:
-            if not (file_input and dir_input):
+            if not (file_input and self._dir_input.text()):
                 self.show_message_box("You have to choose both file and directory.", title="Missing Input", message_type="warning")
-            elif source_lang == "" or target_lang == "":
-                self.show_message_box("You have to set both source and target language.", title="Missing Language", message_type="warning")
-            elif source_lang == "(empty)" or target_lang == "(empty)":
-                self.show_message_box("Source and target languages cannot be (empty).", title="Invalid Language", message_type="warning")
-            elif source_lang == target_lang:
-                self.show_message_box("Source and target language are same. No need for translation.", title="No need for translation",
-                                      message_type="warning")
-            else:
+            elif self.validate_languages(source_lang, target_lang):
                 self.show_message_box(
                     f"Do you want to start the translation process?",
                     title="Translation Info", message_type="information")
 
-                payload = TranslationPayload(file_input, dir_input, source_lang, target_lang)
+                payload = TranslationPayload(file_input, dir_input, source_lang, target_lang,
+                                             self._incremental_checkbox.isChecked())
 
                 """
                 self._progress_bar.setRange(0, 0)  # Indeterminate mode starts
@@ -208,7 +282,7 @@ class SubtitleTranslatorGUI(QMainWindow):
                 # Create a new Thread for processing the subtitle
                 self.thread = QThread()
                 # Init worker
-                self.worker = TranslationWorker(payload)
+                self.worker = TranslationWorker(payload, profile=self._profile_checkbox.isChecked())
                 # Move worker to the thread
                 self.worker.moveToThread(self.thread)
                 # Connect signals
@@ -217,19 +291,107 @@ class SubtitleTranslatorGUI(QMainWindow):
                 self.worker.finished.connect(self.worker.deleteLater)
                 self.thread.finished.connect(self.thread.deleteLater)
                 self.worker.finished.connect(self.on_translation_finished)
+                self.worker.progress.connect(self.on_translation_progress)
+                self.worker.cancelled.connect(self.thread.quit)
+                self.worker.cancelled.connect(self.worker.deleteLater)
+                self.worker.cancelled.connect(self.on_translation_cancelled)
+                self.worker.failed.connect(self.thread.quit)
+                self.worker.failed.connect(self.worker.deleteLater)
+                self.worker.failed.connect(self.on_translation_failed)
                 # Start the thread
                 self.thread.start()
+                self._translation_running = True
 
                 # Make buttons unresponsive while the translation is being processed
                 self._file_browse_button.setEnabled(False)
                 self._dir_browse_button.setEnabled(False)
                 self._source_dropdown.setEnabled(False)
                 self._target_dropdown.setEnabled(False)
+                self._incremental_checkbox.setEnabled(False)
+                self._profile_checkbox.setEnabled(False)
                 self._translate_button.setEnabled(False)
+                self._pause_button.setEnabled(True)
+                self._cancel_button.setEnabled(True)
+
+    def on_pause_button_clicked(self):
+        """
+        Pauses the running translation or resumes it if it's paused. Chunks translated so far are kept.
+        """
+        if not self._translation_running:
+            return
+        if self._pause_button.text() == "Pause":
+            self.worker.pause()
+            self._pause_button.setText("Resume")
+        else:
+            self.worker.resume()
+            self._pause_button.setText("Pause")
+
+    def on_cancel_button_clicked(self):
+        """
+        Cancels the running translation. The worker stops at its next checkpoint and requests
+        that are still in flight are abandoned.
+        """
+        if not self._translation_running:
+            return
+        self._pause_button.setEnabled(False)
+        self._cancel_button.setEnabled(False)
+        self.worker.cancel()
+
+    def on_translation_cancelled(self):
+        """
+        This method will be called once the translation worker stopped after a cancellation.
+        """
+        self.reset_controls()
+        self.show_message_box("Translation cancelled. No file was written.", title="Cancelled",
+                              message_type="information")
+
+    def on_translation_failed(self, error):
+        """
+        This method will be called if the translation worker stopped with an error.
+        """
+        self.reset_controls()
+        self.show_message_box(f"Translation failed: {error}", title="Error", message_type="critical")
+
+    def reset_controls(self):
+        """
+        Re-enables the inputs and resets the job controls after a translation ended.
+        """
+        self._translation_running = False
+        self._progress_label.setText("")
+        self.update_progress_bar(0)
+
+        self._file_browse_button.setEnabled(True)
+        self._dir_browse_button.setEnabled(True)
+        self._source_dropdown.setEnabled(True)
+        self._target_dropdown.setEnabled(True)
+        self._incremental_checkbox.setEnabled(True)
+        self._profile_checkbox.setEnabled(True)
+        self._translate_button.setEnabled(True)
+        self._pause_button.setEnabled(False)
+        self._pause_button.setText("Pause")
+        self._cancel_button.setEnabled(False)
 
     def update_progress_bar(self, percent):
         self._progress_bar.setValue(percent)
 
+    def on_translation_progress(self, chars_done, total_chars, chunks_done, total_chunks, throughput, eta):
+        """
+        Receives the throttled progress signal of the translation worker and shows it.
+
+        Args:
+            chars_done (int): Characters translated so far.
+            total_chars (int): Characters to translate in total.
+            chunks_done (int): Chunks translated so far.
+            total_chunks (int): Chunks to translate in total.
+            throughput (float): Current throughput in characters per second.
+            eta (float): Estimated seconds until the translation is done.
+        """
+        if total_chars > 0:
+            self.update_progress_bar(chars_done * 100 // total_chars)
+        minutes, seconds = divmod(int(eta), 60)
+        self._progress_label.setText(f"Chunks: {chunks_done}/{total_chunks}  |  "
+                                     f"{throughput:.0f} chars/s  |  ETA: {minutes}:{seconds:02d}")
+
     def on_translation_finished(self):
         """
         This method will be called once the translation worker finishes.
@@ -237,6 +399,12 @@ class SubtitleTranslatorGUI(QMainWindow):
         """
         # set the flag
         self._translation_finished = True
+        self._translation_running = False
+        self._progress_label.setText("")
+        self.update_progress_bar(100)
+        self._pause_button.setEnabled(False)
+        self._pause_button.setText("Pause")
+        self._cancel_button.setEnabled(False)
 
         self.show_message_box("Translation finished. Your file is ready.\n\n"
                               "The translation was powered by Lingva AI, which provides an automated translation service. "
@@ -250,6 +418,8 @@ class SubtitleTranslatorGUI(QMainWindow):
         self._dir_browse_button.setEnabled(True)
         self._source_dropdown.setEnabled(True)
         self._target_dropdown.setEnabled(True)
+        self._incremental_checkbox.setEnabled(True)
+        self._profile_checkbox.setEnabled(True)
         self._translate_button.setEnabled(True)
 
         # resetting the variables for the next translation
@@ -320,6 +490,12 @@ class SubtitleTranslatorGUI(QMainWindow):
 
     def closeEvent(self, event):
         """Override the closeEvent to ensure Docker is closed when the window is closed."""
+        if self._translation_running:
+            # Stop the running job before the backend goes away
+            self.worker.cancel()
+            self.thread.quit()
+            self.thread.wait(5000)
+        self._batch_queue_panel.cancel_all(wait=True)
         self.close_docker()
         event.accept()  # Ensure the window closes properly
 
@@ -0,0 +1,153 @@
+import re
+
+class LanguageDetector:
+    """
+    Fast offline language detection for subtitle text, so the source language can be picked automatically
+    and cues that are already in the target language are not sent for translation.
+
+    The script of the letters decides first (e.g. Hangul is Korean). Latin and Cyrillic text is scored
+    against the most common words of each language, which works on the short lines of subtitles where
+    character statistics are too sparse.
+    """
+
+    # Source language value for "detect it from the file"
+    AUTO = "auto"
+    # Name of the option in the GUI dropdown
+    AUTO_DETECT_NAME = "Auto-detect"
+
+    # Unicode ranges of the scripts that identify a language on their own
+    _script_languages = [
+        ((0xAC00, 0xD7AF), "ko"),
+        ((0x3040, 0x30FF), "ja"),
+        ((0x4E00, 0x9FFF), "zh"),
+        ((0x0E00, 0x0E7F), "th"),
+        ((0x0900, 0x097F), "hi"),
+        ((0x0590, 0x05FF), "iw"),
+        ((0x0600, 0x06FF), "ar"),
+        ((0x0370, 0x03FF), "el"),
+    ]
+    _cyrillic_range = (0x0400, 0x04FF)
+
+    # Letters only one Cyrillic language uses
+    _cyrillic_letters = {
+        "sr": set("ђћџљњј"),
+        "uk": set("іїєґ"),
+        "ru": set("ыэё"),
+    }
+
+    _common_words = {
+        "en": {"the", "and", "you", "to", "is", "it", "that", "of", "what", "this", "in", "me", "my", "have",
+               "don't", "are", "be", "your", "was", "we", "for", "not", "know", "i'm", "it's", "with"},
+        "sr": {"je", "da", "se", "ne", "sam", "što", "šta", "ti", "mi", "ali", "za", "kako", "ovo", "nije",
+               "li", "će", "bi", "smo", "sve", "ovde", "ima", "jer", "sa", "od", "kad", "samo"},
+        "de": {"der", "die", "das", "und", "ist", "nicht", "ich", "du", "ein", "eine", "zu", "sie", "wir",
+               "was", "mit", "den", "auf", "mir", "habe", "ja", "es", "mich", "dich", "hier"},
+        "fr": {"le", "la", "les", "et", "est", "pas", "je", "vous", "tu", "que", "un", "une", "il", "ce",
+               "c'est", "on", "qui", "pour", "moi", "suis", "mais", "avec", "nous", "ça"},
+        "es": {"el", "los", "que", "y", "es", "no", "un", "una", "por", "lo", "qué", "con", "para", "está",
+               "yo", "eso", "pero", "estoy", "tengo", "las", "muy", "aquí", "del"},
+        "it": {"il", "che", "è", "non", "di", "un", "una", "per", "sono", "ci", "cosa", "sei", "questo",
+               "io", "ho", "ma", "hai", "della", "anche", "bene", "qui", "perché"},
+        "pt": {"o", "que", "é", "não", "um", "uma", "você", "eu", "em", "para", "isso", "com", "os", "está",
+               "mas", "ele", "ela", "aqui", "muito", "vou", "tem", "estou"},
+        "nl": {"de", "het", "een", "en", "is", "niet", "ik", "je", "dat", "van", "wat", "zijn", "we", "hij",
+               "op", "maar", "er", "met", "heb", "jij", "hier", "ben"},
+        "ru": {"что", "это", "не", "я", "ты", "вы", "мы", "он", "как", "так", "нет", "все", "мне", "его",
+               "она", "меня", "тебя", "может", "здесь", "только"},
+        "sr-cyrillic": {"је", "да", "се", "не", "сам", "шта", "што", "ти", "ми", "али", "за", "како", "ово",
+                        "није", "ли", "ће", "би", "смо", "све", "овде", "има", "само"},
+    }
+
+    # Languages the detector can tell, and the ones among them it may mistake for each other
+    _detectable_languages = ({language for _, language in _script_languages} | set(_cyrillic_letters)
+                             | (set(_common_words) - {"sr-cyrillic"}))
+    _confusable_languages = [{"sr", "ru", "uk"}, {"es", "pt", "it"}, {"de", "nl"}, {"zh", "ja"}]
+
+    _tag_pattern = re.compile(r"<[^>]+>|\{[^}]*\}")
+    _word_pattern = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+    @staticmethod
+    def can_tell_apart(detected_lang, source_lang):
+        """
+        Tells whether a text detected as detected_lang really isn't in source_lang. Languages the detector
+        doesn't know get labelled as a related one it knows (e.g. Croatian as Serbian), so that is only
+        certain if it knows source_lang and doesn't confuse the two.
+
+        Args:
+            detected_lang (str): The language code returned by detect().
+            source_lang (str): The language code the text is supposed to be in.
+
+        Returns:
+            bool: True if the detected language can be trusted over source_lang.
+        """
+        if source_lang not in LanguageDetector._detectable_languages or detected_lang == source_lang:
+            return False
+        return not any(detected_lang in languages and source_lang in languages
+                       for languages in LanguageDetector._confusable_languages)
+
+    @staticmethod
+    def detect(text, min_words=4):
+        """
+        Detects the language of a text.
+
+        Args:
+            text (str): The text to detect, formatting tags are ignored.
+            min_words (int): Texts with fewer words are too short to tell and are left undetermined.
+
+        Returns:
+            str: The language code (e.g., 'en'), or None if the language can't be told reliably.
+        """
+        text = LanguageDetector._tag_pattern.sub(" ", text).lower()
+        letters = [char for char in text if char.isalpha()]
+        if not letters:
+            return None
+
+        # Scripts that identify the language on their own
+        for (start, end), language in LanguageDetector._script_languages:
+            if sum(1 for char in letters if start <= ord(char) <= end) > len(letters) / 2:
+                return language
+
+        words = LanguageDetector._word_pattern.findall(text)
+        if len(words) < min_words:
+            return None
+
+        cyrillic = sum(1 for char in letters
+                       if LanguageDetector._cyrillic_range[0] <= ord(char) <= LanguageDetector._cyrillic_range[1])
+        if cyrillic > len(letters) / 2:
+            for language, distinct_letters in LanguageDetector._cyrillic_letters.items():
+                if any(char in distinct_letters for char in letters):
+                    return language
+            candidates = ["ru", "sr-cyrillic"]
+        else:
+            candidates = [language for language in LanguageDetector._common_words
+                          if language not in ("ru", "sr-cyrillic")]
+
+        scores = sorted(((sum(1 for word in words if word in LanguageDetector._common_words[language]), language)
+                         for language in candidates), reverse=True)
+        best_score, best_language = scores[0]
+        second_score = scores[1][0] if len(scores) > 1 else 0
+        # At least two common words and a clear lead over the runner-up
+        if best_score < 2 or best_score < second_score * 1.5:
+            return None
+        return "sr" if best_language == "sr-cyrillic" else best_language
+
+    @staticmethod
+    def detect_language(texts, max_chars=5000):
+        """
+        Detects the dominant language of a file from an evenly spread sample of its cue texts.
+
+        Args:
+            texts (list): Cue texts of the file.
+            max_chars (int): Upper bound of the sampled characters, keeps detection fast on long files.
+
+        Returns:
+            str: The language code, or None if it can't be told.
+        """
+        texts = [text for text in texts if text.strip()]
+        if not texts:
+            return None
+        average_length = max(1, sum(len(text) for text in texts) // len(texts))
+        sample_size = max(1, min(len(texts), max_chars // average_length))
+        step = len(texts) / sample_size
+        sample = [texts[int(index * step)] for index in range(sample_size)]
+        return LanguageDetector.detect(" ".join(sample))
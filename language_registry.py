@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+import requests
+
+from subtitle_writer import SubtitleWriter
+from language_detector import LanguageDetector
+
+class UnsupportedLanguageError(ValueError):
+    """
+    Raised when a language or language pair is not supported by the translation service.
+    """
+
+class LanguageRegistry:
+    """
+    Languages supported by Lingva, fetched once from /api/v1/languages and cached on disk.
+
+    The cache is used while it's younger than `cache_ttl` seconds. If Lingva can't be reached, a stale
+    cache is used, and without any cache a small built-in list.
+
+    Args:
+        base_url (str): Url of the Lingva instance.
+        cache_path (str): Where the language list is cached, defaults to ~/.quicksub/languages.json.
+        cache_ttl (int): Seconds the cached list stays valid.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    # Used when neither Lingva nor the cache is available
+    _fallback_languages = {
+        "source": [{"code": "en", "name": "English"}, {"code": "sr", "name": "Serbian"}],
+        "target": [{"code": "en", "name": "English"}, {"code": "sr", "name": "Serbian"}],
+    }
+
+    @staticmethod
+    def get_instance():
+        """
+        Retrieves the shared LanguageRegistry, loading the languages on first use.
+
+        Returns:
+            LanguageRegistry: The shared registry.
+        """
+        with LanguageRegistry._instance_lock:
+            if LanguageRegistry._instance is None:
+                LanguageRegistry._instance = LanguageRegistry()
+                LanguageRegistry._instance.load()
+            return LanguageRegistry._instance
+
+    def __init__(self, base_url="http://localhost:3000", cache_path=None, cache_ttl=7 * 24 * 3600):
+        self._base_url = base_url
+        self._cache_path = cache_path or os.path.join(os.path.expanduser("~"), ".quicksub", "languages.json")
+        self._cache_ttl = cache_ttl
+        self._languages = LanguageRegistry._fallback_languages
+
+    def load(self):
+        """
+        Loads the languages from the cache if it's fresh, otherwise from Lingva (refreshing the cache).
+        """
+        cache = self.read_cache()
+        if cache and time.time() - cache.get("fetched_at", 0) < self._cache_ttl:
+            self._languages = cache["languages"]
+            return
+
+        languages = self.fetch_languages()
+        if languages:
+            self._languages = languages
+            self.write_cache(languages)
+        elif cache:
+            print("Could not fetch the supported languages, using the cached list.")
+            self._languages = cache["languages"]
+        else:
+            print("Could not fetch the supported languages, using the built-in list.")
+
+    def fetch_languages(self):
+        """
+        Fetches the source and target languages from Lingva.
+
+        Returns:
+            dict: 'source' and 'target' lists of {'code', 'name'} dicts, or None if the request failed.
+        """
+        languages = {}
+        for language_type in ("source", "target"):
+            try:
+                response = requests.get(f"{self._base_url}/api/v1/languages/{language_type}", timeout=5)
+                if response.status_code != 200:
+                    return None
+                # 'auto' is Lingva's own detection, not a language
+                languages[language_type] = [language for language in response.json().get("languages", [])
+                                            if language.get("code") != "auto"]
+            except (requests.ConnectionError, requests.Timeout, ValueError):
+                return None
+        return languages
+
+    def read_cache(self):
+        try:
+            with open(self._cache_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def write_cache(self, languages):
+        try:
+            os.makedirs(os.path.dirname(self._cache_path), exist_ok=True)
+            data = json.dumps({"fetched_at": time.time(), "languages": languages}, ensure_ascii=False)
+            SubtitleWriter.write_bytes(self._cache_path, data.encode("utf-8"))
+        except OSError as e:
+            print(f"Could not cache the supported languages: {e}")
+
+    def get_source_languages(self):
+        """
+        Returns:
+            list: Names of the languages that can be translated from.
+        """
+        return [language["name"] for language in self._languages["source"]]
+
+    def get_target_languages(self):
+        """
+        Returns:
+            list: Names of the languages that can be translated to.
+        """
+        return [language["name"] for language in self._languages["target"]]
+
+    def get_code(self, name):
+        """
+        Maps a language name (or code) to its code.
+
+        Returns:
+            str: The language code, or None if the language is not supported.
+        """
+        for language in self._languages["source"] + self._languages["target"]:
+            if name in (language["name"], language["code"]):
+                return language["code"]
+        return None
+
+    def validate_pair(self, source_lang, target_lang):
+        """
+        Checks that a translation from source_lang to target_lang is supported, before anything is sent.
+
+        Args:
+            source_lang (str): The language code for the source language (e.g., 'en'), or 'auto' if it
+                will be detected from the file.
+            target_lang (str): The language code for the target language (e.g., 'sr').
+
+        Raises:
+            UnsupportedLanguageError: If one of the languages is not supported or they are the same.
+        """
+        source_codes = {language["code"] for language in self._languages["source"]} | {LanguageDetector.AUTO}
+        if source_lang not in source_codes:
+            raise UnsupportedLanguageError(f"Source language '{source_lang}' is not supported.")
+        if target_lang not in {language["code"] for language in self._languages["target"]}:
+            raise UnsupportedLanguageError(f"Target language '{target_lang}' is not supported.")
+        if source_lang == target_lang:
+            raise UnsupportedLanguageError("Source and target language are the same.")
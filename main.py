@@ -1,9 +1,55 @@
+import argparse
+import sys
+
 from docker_checker import DockerChecker
 from gui import SubtitleTranslatorGUI
+from language_registry import LanguageRegistry, UnsupportedLanguageError
+from pa_translator_service import PATranslatorService
+from translation_payload import TranslationPayload
+from watch_folder import FolderWatcher
+
+# Warmed up when the pair isn't known yet (the GUI picks it per job), any pair pays Lingva's cold start
+DEFAULT_WARM_UP_PAIR = ("auto", "en")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="QuickSub - Subtitle Translator")
+    parser.add_argument("--watch", metavar="DIR", help="Watch a folder and translate new subtitle files without the GUI")
+    parser.add_argument("--output", metavar="DIR", help="Where translated files are saved (default: the watched folder)")
+    parser.add_argument("--source", default="Auto-detect", help="Source language name or code (default: Auto-detect)")
+    parser.add_argument("--target", default="English", help="Target language name or code (default: English)")
+    parser.add_argument("--workers", type=int, default=2, help="Number of files translated at the same time (default: 2)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Write a profile report and collapsed stacks (for flame graphs) next to every translated file")
+    parser.add_argument("--max-concurrency", type=int, default=16,
+                        help="Highest number of requests sent to the translation service at once (default: 16)")
+    parser.add_argument("--rate-limit", type=float, metavar="RPS",
+                        help="Maximum requests per second sent to the translation service (default: no limit)")
+    parser.add_argument("--burst", type=int, help="Requests that may be sent at once under the rate limit (default: the rate)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    arguments = parse_arguments()
     docker_checker = DockerChecker()
     docker_checker.check_docker(required_containers=["lingva-translate"])  # Check Docker and containers
     docker_checker.wait_for_container("lingva-translate")
     docker_checker.wait_for_service("http://localhost:3000/api")
-    SubtitleTranslatorGUI.run()  # Run the GUI if Docker and containers are available
\ No newline at end of file
+    if arguments.watch:
+        # Check the pair the watcher translates with once, instead of failing on every file, and warm it up
+        warm_up_pair = (TranslationPayload.map_languages(arguments.source), TranslationPayload.map_languages(arguments.target))
+        try:
+            LanguageRegistry.get_instance().validate_pair(*warm_up_pair)
+        except UnsupportedLanguageError as e:
+            print(f"Can't translate from '{arguments.source}' to '{arguments.target}': {e}")
+            sys.exit(1)
+    else:
+        warm_up_pair = DEFAULT_WARM_UP_PAIR
+    baseline_latency = docker_checker.warm_up_service("http://localhost:3000/api", [warm_up_pair])
+    PATranslatorService.configure_from_latency(baseline_latency)  # Tune timeout and concurrency
+    PATranslatorService.configure_backend(max_limit=max(1, arguments.max_concurrency), rate=arguments.rate_limit,
+                                          burst=arguments.burst)
+    if arguments.watch:
+        # Headless mode, runs until interrupted
+        FolderWatcher(arguments.watch, arguments.output, arguments.source, arguments.target, arguments.workers,
+                      profile=arguments.profile).run()
+    else:
+        SubtitleTranslatorGUI.run()  # Run the GUI if Docker and containers are available
@@ -1,19 +1,65 @@
+import json
+import os
 import requests
 import re
+import hashlib
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from requests.adapters import HTTPAdapter
+
+from progress_reporter import ProgressReporter
+from single_flight import SingleFlight
+from adaptive_limiter import AdaptiveConcurrencyLimiter
+from subtitle_writer import SubtitleWriter
+from language_registry import LanguageRegistry
+from language_detector import LanguageDetector
+from profiler import JobProfiler
+
+class TranslationFailedError(Exception):
+    """
+    Raised when a chunk could not be translated, even after retrying.
+    """
 
 class PATranslatorService:
 
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-
-    def __init__(self, payload, ):
+    # Backend tuning shared by every job. Defaults are conservative and get adjusted by
+    # configure_from_latency once the service has been warmed up.
+    # Lingva instance the translations are sent to
+    _base_url = "http://localhost:3000"
+    # Seconds to wait for a single translation request
+    _request_timeout = 30
+    # Number of chunks translated in parallel when a job starts, the adaptive limiter moves it from there
+    _max_concurrency = 2
+    # Limits per backend: highest in-flight limit and optional request rate cap (requests per second, burst),
+    # changed with configure_backend
+    _backend_limits = {
+        "http://localhost:3000": {"max_limit": 16, "rate": None, "burst": None},
+    }
+    # Adaptive concurrency limiter of every backend, created on first use
+    _limiters = {}
+    _limiters_lock = threading.Lock()
+    # How many times a failed chunk request is retried before giving up
+    _max_retries = 3
+    # HTTP client shared by all jobs so concurrent jobs reuse the same pooled connections
+    _session = None
+    _session_lock = threading.Lock()
+    # Identical requests in flight at the same time (same text in several jobs) share one backend call
+    _single_flight = SingleFlight()
+
+    def __init__(self, payload, progress_callback=None, cancellation_token=None, bulk_writer=None, profile=False):
         self.initialize_payload(payload)
         self.initialize_translation_attributes()
+        # Receives (chars_done, total_chars, chunks_done, total_chunks, throughput, eta) while translating
+        self._progress_callback = progress_callback
+        # Checked between chunks and requests, lets the user cancel or pause the job
+        self._cancellation_token = cancellation_token
+        # Batch runs hand their output to a shared BulkWriter instead of writing every file right away
+        self._bulk_writer = bulk_writer
+        # Writes a profile of the job next to the output, see JobProfiler
+        self._profile = profile
+        self._profiler = None
 
     def initialize_payload(self, payload):
         """
@@ -24,6 +70,7 @@ class PATranslatorService:
         self._dir_path = payload.get_dir_path()
         self._source_lang = payload.get_source_lang()
         self._target_lang = payload.get_target_lang()
+        self._incremental = payload.is_incremental()
 
     def initialize_translation_attributes(self):
         """
@@ -31,10 +78,6 @@ class PATranslatorService:
         """
         # Sets the maximum number of characters to be handled at once. Defaults to 2000, which is considered optimal for Lingva Translate API requests.
         self._max_chars = 2000
-        # Dictionary to store sequence numbers as keys and corresponding timestamps as values
-        self._sequence_numbers_and_timestamps = {}
-        # Needed for updating the progress bar in the GUI
-        self._percentage_of_translation_complete = 0
 
     @staticmethod
     def read_file(file_path):
@@ -48,11 +91,15 @@ class PATranslatorService:
             Exception: Any other unexpected errors during file reading.
         """
         try:
-            # with open(file_path, "r", encoding="utf-8") as file:
-            with open(file_path, "r", encoding="latin-1") as file:
-                raw_data = file.read()  # Read the entire content at once
-                content = raw_data.strip().split("\n")  # Split into lines after reading
-                return content  # Returns a list of strings
+            with open(file_path, "rb") as file:
+                raw_bytes = file.read()  # Read the entire content at once
+            try:
+                # UTF-8 (with or without BOM) first, so non-Latin scripts survive and can be detected
+                raw_data = raw_bytes.decode("utf-8-sig")
+            except UnicodeDecodeError:
+                raw_data = raw_bytes.decode("latin-1")
+            content = raw_data.strip().replace("\r\n", "\n").split("\n")  # Split into lines after reading
+            return content  # Returns a list of strings
         except FileNotFoundError:
             print(f"File not found: {file_path}")
             return []
@@ -64,64 +111,52 @@ class PATranslatorService:
             return []
 
     @staticmethod
-    def remove_timestamps(subs_lines):
+    def parse_cues(subs_lines):
         """
-        Removes subtitle lines that contain timestamps from the provided list of lines.
-        A line is considered a timestamp if it contains the string '-->' or has 4 or more colons.
+        Parses subtitle lines into cues. A cue starts with a sequence number followed by a timestamp line
+        (containing '-->' or 4 or more colons) and holds the text lines up to the next blank line.
 
         Args:
             subs_lines (list): A list of subtitle lines, typically read from a subtitle file.
 
         Returns:
-            list: A list of subtitle lines with timestamp lines removed.
+            list: A list of dicts with the keys 'seq', 'timestamp' and 'text'. The text lines of a cue
+            are joined with a space.
         """
-        clear_subtitles = []
-        for line in subs_lines:
-            if not ("-->" in line or  str(line).count(":") >= 4):
-                clear_subtitles.append(line)
-        return clear_subtitles
+        cues = []
+        cue = None
+        for index, line in enumerate(subs_lines):
+            line = line.strip()
+            next_line = subs_lines[index + 1] if index + 1 < len(subs_lines) else ""
+            # Check if the line is a seq number followed by a timestamp
+            if line.isdigit() and ("-->" in next_line or next_line.count(":") >= 4):
+                cue = {"seq": line, "timestamp": next_line.strip(), "lines": []}
+                cues.append(cue)
+            elif cue is not None and line and line != cue["timestamp"]:
+                cue["lines"].append(line)
+            elif not line:
+                # Blank line ends the cue
+                cue = None
+
+        return [{"seq": cue["seq"], "timestamp": cue["timestamp"], "text": " ".join(cue["lines"])} for cue in cues]
 
-    def separate_seq_nums_and_timestamps(self, subs_lines):
+    @staticmethod
+    def cues_to_lines(cues):
         """
-        Extracts sequence numbers and corresponding timestamps from the provided subtitle lines.
-        Stores them in a dictionary, where sequence numbers are the keys and timestamps are the values.
+        Turns cues into the lines that are sent for translation: the sequence number followed by the cue text.
+        The sequence numbers are used to split the translation back into cues.
 
         Args:
-            subs_lines (list): A list of subtitle lines, where each line is a string.
+            cues (list): Cues as returned by parse_cues.
 
         Returns:
-            None: The sequence numbers and timestamps are stored in the class's
-            '_sequence_numbers_and_timestamps' attribute.
+            list: A list of subtitle lines without timestamps.
         """
-        seq_num = None
-        timestamp = None
-        for line in subs_lines:
-            line = line.strip()
-            # Check if the line is a seq number
-            if line.isdigit():
-                seq_num = line
-            # Check if the line is a timestamp
-            if str(line).count(":") >= 4:
-                if seq_num:
-                    timestamp = line
-                    self._sequence_numbers_and_timestamps[seq_num] = timestamp
-                    #Reseting for the next iteration
-                    seq_num = None
-                    timestamp = None
-
-    def process_subtitles(self, sub_lines):
-        """
-        Processes subtitle lines by removing timestamps and extracting sequence numbers and timestamps.
-
-        Args:
-            sub_lines (list): A list of subtitle lines, where each line is a string.
-
-        Returns:
-            list: A list of subtitle lines with timestamps removed.
-        """
-        subs_without_timestamps = PATranslatorService.remove_timestamps(sub_lines)
-        PATranslatorService.separate_seq_nums_and_timestamps(self, sub_lines)
-        return subs_without_timestamps
+        lines = []
+        for cue in cues:
+            lines.append(cue["seq"])
+            lines.append(cue["text"])
+        return lines
 
     @staticmethod
     def line_cleanup(line):
@@ -171,12 +206,94 @@ class PATranslatorService:
         line = line.replace(";", "?")
         return line
     
+    # Characters that end a sentence. A cue ending with anything else continues in the next cue.
+    _sentence_endings = (".", "!", "?", "…", "♪", '"', "'", "»", ")", "]")
+
+    @staticmethod
+    def split_into_units(subs_lines):
+        """
+        Groups subtitle lines into packing units. A unit starts at a sequence number line and holds the
+        text lines that follow it, so a chunk is only ever cut at a cue boundary.
+
+        Args:
+            subs_lines (list): A list of subtitle lines without timestamps.
+
+        Returns:
+            list: A list of (cleaned unit text, raw cue text) tuples.
+        """
+        units = []
+        cleaned_parts = []
+        raw_parts = []
+        for line in subs_lines:
+            if line.strip().isdigit() and cleaned_parts:
+                units.append(("".join(cleaned_parts), " ".join(raw_parts)))
+                cleaned_parts = []
+                raw_parts = []
+
+            if line.strip().isdigit():
+                # Sequence numbers are separated with spaces to ensure they're properly handled by the API
+                cleaned_parts.append(f" {line.strip()} ")
+            else:
+                cleaned_parts.append(PATranslatorService.line_cleanup(line))
+                raw_parts.append(line.strip())
+        if cleaned_parts:
+            units.append(("".join(cleaned_parts), " ".join(raw_parts)))
+
+        return units
+
+    @staticmethod
+    def group_sentences(units, max_chars):
+        """
+        Merges consecutive units into sentence groups, so a sentence spread over several cues is
+        translated in one request. Groups that would exceed max_chars are not merged further.
+
+        Args:
+            units (list): Units as returned by split_into_units.
+            max_chars (int): Maximum number of characters in a group.
+
+        Returns:
+            list: A list of group texts.
+        """
+        groups = []
+        group = ""
+        sentence_open = False
+        for unit_text, raw_text in units:
+            if sentence_open and len(group) + len(unit_text) <= max_chars:
+                group += unit_text
+            else:
+                if group:
+                    groups.append(group)
+                group = unit_text
+            sentence_open = bool(raw_text) and not raw_text.endswith(PATranslatorService._sentence_endings)
+        if group:
+            groups.append(group)
+
+        return groups
+
+    @staticmethod
+    def count_chunks(sizes, capacity):
+        """
+        Counts the chunks needed to pack items of the given sizes, in order, into chunks of the given capacity.
+        """
+        count = 0
+        current = capacity
+        for size in sizes:
+            if current + size > capacity:
+                count += 1
+                current = 0
+            current += size
+        return count
+
     def create_chunks(self, subs_lines):
         """
         Splits a list of subtitle lines into chunks, ensuring each chunk does not exceed the maximum character limit.
 
-        If a chunk is near the limit, it will start a new one. Additionally, if a line contains only a sequence number,
-        it will be separated with a space to ensure it's properly handled by the API.
+        Chunks are only cut at sentence boundaries, or at cue boundaries if a sentence doesn't fit into one chunk.
+        Instead of filling chunks greedily (one full chunk and a small remainder), the chunk sizes are balanced:
+        the number of chunks is rounded up to fill every round of parallel requests (as long as the chunks stay
+        at least half full, to keep translation context), and the chunk capacity is
+        the smallest one that still packs the text into that many chunks. This way the parallel requests finish
+        at about the same time.
 
         Args:
             subs_lines (list): A list of subtitle lines to be split into chunks.
@@ -184,47 +301,217 @@ class PATranslatorService:
         Returns:
             list: A list of subtitle chunks, each of which does not exceed the maximum allowed character length.
         """
+        groups = self.group_sentences(self.split_into_units(subs_lines), self._max_chars)
+        if not groups:
+            return []
+        sizes = [len(group) for group in groups]
+
+        # A single cue longer than the limit still has to go out as its own chunk
+        max_capacity = max(self._max_chars, max(sizes))
+        min_chunks = self.count_chunks(sizes, max_capacity)
+        concurrency = PATranslatorService.get_limiter().get_limit()
+        # Extra chunks only while they stay at least half full, smaller ones would lose translation context
+        max_useful_chunks = max(1, sum(sizes) // (self._max_chars // 2))
+        target_chunks = max(min_chunks, min(len(groups), max_useful_chunks, -(-min_chunks // concurrency) * concurrency))
+
+        # Binary search for the smallest capacity that packs the groups into target_chunks chunks
+        low, high = max(sizes), max_capacity
+        while low < high:
+            capacity = (low + high) // 2
+            if self.count_chunks(sizes, capacity) <= target_chunks:
+                high = capacity
+            else:
+                low = capacity + 1
+
         chunks = []
         chunk = ""
-
-        for line in subs_lines:
-            line = PATranslatorService.line_cleanup(line)
-
-            if len(chunk) <= self._max_chars - len(line):
-                if line.strip().isdigit():
-                    line = f" {line} "
-                chunk += line
-            else:
+        for group in groups:
+            if chunk and len(chunk) + len(group) > low:
                 chunks.append(chunk.strip())
-                chunk = line
+                chunk = ""
+            chunk += group
         # Making sure the last chunk is appended to the chunks list
-        if len(chunk) > 0:
+        if chunk.strip():
             chunks.append(chunk.strip())
 
         return chunks
 
+    @classmethod
+    def configure_from_latency(cls, baseline_latency):
+        """
+        Adjusts the request timeout and concurrency to the latency measured while warming up the service.
+
+        A warm-up sentence is much shorter than a chunk, so the timeout gets a generous multiple of the
+        baseline. A fast backend can take more parallel requests, a slow one gets fewer so it doesn't time out.
+
+        Args:
+            baseline_latency (float): Latency of a warm-up translation in seconds, or None if unknown.
+        """
+        if baseline_latency is None:
+            return
+        cls._request_timeout = min(120, max(10, int(baseline_latency * 20)))
+        if baseline_latency < 0.5:
+            cls._max_concurrency = 8
+        elif baseline_latency < 1.5:
+            cls._max_concurrency = 4
+        else:
+            cls._max_concurrency = 2
+        # Limiters start again from the new concurrency
+        with cls._limiters_lock:
+            cls._limiters.clear()
+        print(f"Translator tuned: timeout {cls._request_timeout}s, concurrency {cls._max_concurrency}")
+
+    @classmethod
+    def configure_backend(cls, base_url=None, max_limit=16, rate=None, burst=None):
+        """
+        Sets the limits of a backend. Its limiter is created again with the new limits on the next request.
+
+        Args:
+            base_url (str): Url of the backend, defaults to the configured one.
+            max_limit (int): Highest number of requests in flight.
+            rate (float): Optional, maximum requests per second.
+            burst (int): Optional, number of requests that may be sent at once under the rate cap.
+        """
+        base_url = base_url or cls._base_url
+        with cls._limiters_lock:
+            cls._backend_limits[base_url] = {"max_limit": max_limit, "rate": rate, "burst": burst}
+            cls._limiters.pop(base_url, None)
+        rate_text = f", {rate} requests/s" if rate else ""
+        print(f"Backend {base_url}: up to {max_limit} requests in flight{rate_text}")
+
+    @classmethod
+    def get_limiter(cls, base_url=None):
+        """
+        Returns the adaptive concurrency limiter of a backend, creating it with the backend's limits on first use.
+
+        Args:
+            base_url (str): Url of the backend, defaults to the configured one.
+
+        Returns:
+            AdaptiveConcurrencyLimiter: The limiter shared by all jobs that use this backend.
+        """
+        base_url = base_url or cls._base_url
+        with cls._limiters_lock:
+            if base_url not in cls._limiters:
+                limits = cls._backend_limits.get(base_url, {})
+                cls._limiters[base_url] = AdaptiveConcurrencyLimiter(cls._max_concurrency,
+                                                                     max_limit=limits.get("max_limit", 16),
+                                                                     rate=limits.get("rate"),
+                                                                     burst=limits.get("burst"))
+            return cls._limiters[base_url]
+
+    @classmethod
+    def get_backend_stats(cls):
+        """
+        Returns:
+            dict: Backend urls as keys and the stats of their limiter (current limit, requests in flight,
+            latencies, request counters) as values.
+        """
+        with cls._limiters_lock:
+            limiters = dict(cls._limiters)
+        return {base_url: limiter.get_stats() for base_url, limiter in limiters.items()}
+
+    @classmethod
+    def get_session(cls):
+        """
+        Returns the HTTP session shared by every translation job, creating it on first use.
+        The connection pool is sized for several jobs translating at the same time.
+
+        Returns:
+            requests.Session: The shared session.
+        """
+        with cls._session_lock:
+            if cls._session is None:
+                cls._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=32)
+                cls._session.mount("http://", adapter)
+            return cls._session
+
     @staticmethod
-    def translate_text(source_lang, target_lang, text):
+    def translate_text(source_lang, target_lang, text, cancellation_token=None):
         """
         Translates a given text from source_lang to target_lang by calling a translation API.
 
+        Concurrent callers translating the same text between the same languages wait for a single
+        request and share its result. The request runs on the thread of the first caller. Pausing or
+        cancelling one job only stops that job from waiting for it, the request itself pauses or stops
+        only when no other job waits for it.
+
         Args:
             source_lang (str): The language code for the source language (e.g., 'en').
             target_lang (str): The language code for the target language (e.g., 'sr').
             text (str): The text to be translated.
+            cancellation_token (CancellationToken): Optional, token of the job asking for the translation.
 
         Returns:
-            str: The translated text or an error message if the translation fails.
+            str: The translated text.
+
+        Raises:
+            TranslationCancelled: If the job is cancelled.
+            TranslationFailedError: If the text could not be translated.
         """
-        url = f"http://localhost:3000/api/v1/{source_lang}/{target_lang}/{text}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json().get("translation", "Translation not found")
-        else:
-            return f"Error: {response.json().get('error', 'Unknown error')}"
+        key = (source_lang, target_lang, hashlib.sha256(text.encode("utf-8")).hexdigest())
+        return PATranslatorService._single_flight.do(
+            key,
+            lambda checkpoint: PATranslatorService.request_translation(source_lang, target_lang, text, checkpoint),
+            cancellation_token)
+
+    @staticmethod
+    def request_translation(source_lang, target_lang, text, checkpoint=None):
+        """
+        Sends a translation request for the given text to the translation API.
+        Timeouts, connection errors, 429 and 5xx responses are retried with a growing back-off.
+        Every attempt waits for a slot of the backend's adaptive limiter and reports its latency back to it.
+
+        Args:
+            source_lang (str): The language code for the source language (e.g., 'en').
+            target_lang (str): The language code for the target language (e.g., 'sr').
+            text (str): The text to be translated.
+            checkpoint (callable): Optional, called before every attempt and while waiting for the limiter.
+                It blocks while the request is paused and raises once nobody needs the translation anymore.
+
+        Returns:
+            str: The translated text.
+
+        Raises:
+            TranslationCancelled: If the request is abandoned before or between attempts.
+            TranslationFailedError: If the translation failed on the last attempt or with a client error.
+        """
+        url = f"{PATranslatorService._base_url}/api/v1/{source_lang}/{target_lang}/{text}"
+        limiter = PATranslatorService.get_limiter()
+        error = "Unknown error"
+        for attempt in range(PATranslatorService._max_retries + 1):
+            if attempt > 0:
+                time.sleep(attempt)  # Back off a little more with every retry
+            if checkpoint:
+                checkpoint()
+            limiter.acquire(checkpoint)
+            start_time = time.monotonic()
+            try:
+                response = PATranslatorService.get_session().get(url, timeout=PATranslatorService._request_timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                limiter.release(time.monotonic() - start_time, success=False, size=len(text))
+                error = str(e)
+                continue
+            overloaded = response.status_code >= 500 or response.status_code == 429
+            limiter.release(time.monotonic() - start_time, success=not overloaded, size=len(text))
+            if response.status_code == 200:
+                try:
+                    return response.json()["translation"]
+                except (ValueError, KeyError):
+                    raise TranslationFailedError("The translation service returned no translation.")
+            try:
+                error = response.json().get('error', 'Unknown error')
+            except ValueError:
+                error = f"Status {response.status_code}"
+            # Client errors won't get better by retrying
+            if not overloaded:
+                break
+        raise TranslationFailedError(f"A chunk could not be translated: {error}")
 
     @staticmethod
-    def translate_chunks(chunks, source_lang, target_lang):
+    def translate_chunks(chunks, source_lang, target_lang, progress_reporter=None, cancellation_token=None,
+                         profiler=None):
         """
         Translates a list of chunks from source_lang to target_lang and reassembles them.
 
@@ -232,108 +519,372 @@ class PATranslatorService:
             chunks (list): A list of subtitle chunks to be translated.
             source_lang (str): The language code for the source language (e.g., 'en').
             target_lang (str): The language code for the target language (e.g., 'sr').
+            progress_reporter (ProgressReporter): Optional, notified after every translated chunk.
+            cancellation_token (CancellationToken): Optional, checked before and after every chunk.
+            profiler (JobProfiler): Optional, records the network wait and samples the request threads.
 
         Returns:
             list: A list of translated and reassembled subtitle chunks.
+
+        Raises:
+            TranslationCancelled: If the job is cancelled. Queued chunks are dropped and requests
+            that are still in flight are abandoned.
         """
-        translated_chunks = []
-        percentage_step = round(100 / len(chunks), 2)
-        #
-        for chunk  in chunks:
+        def translate_chunk(chunk):
+            if cancellation_token:
+                cancellation_token.checkpoint()
             chunk = chunk.strip().replace("\n", " ")
-            translation = PATranslatorService.translate_text(source_lang, target_lang, chunk)
+            request_start = time.perf_counter()
+            translation = PATranslatorService.translate_text(source_lang, target_lang, chunk, cancellation_token)
+            if profiler:
+                profiler.record_network_wait(time.perf_counter() - request_start)
             translation = PATranslatorService.line_reassemble(translation)
-            translated_chunks.append(translation)
-
-            PATranslatorService._instance.calculate_translation_progress_in_percents(percentage_step)
+            if cancellation_token:
+                cancellation_token.checkpoint()
+            if progress_reporter:
+                progress_reporter.chunk_done(len(chunk))
+            return translation
+
+        # Enough threads for the highest limit, the limiter decides how many requests are actually in flight
+        executor = ThreadPoolExecutor(max_workers=PATranslatorService.get_limiter().get_max_limit(),
+                                      initializer=profiler.register_thread if profiler else None)
+        try:
+            futures = [executor.submit(translate_chunk, chunk) for chunk in chunks]
+            # Collecting in submission order keeps the order of the chunks, no matter which request finishes first
+            translated_chunks = [future.result() for future in futures]
+        except BaseException:
+            # Don't wait for in-flight requests, their results are not needed anymore
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
 
         return translated_chunks
 
+    @staticmethod
+    def group_sequence_numbers(chunks, sequence_numbers):
+        """
+        Finds the sequence numbers of the cues in every chunk. Chunks are only cut at cue boundaries,
+        so every chunk starts with the sequence number of its first cue.
+
+        Args:
+            chunks (list): The chunks as returned by create_chunks.
+            sequence_numbers (list): Sequence numbers of the cues in the chunks, in order.
 
-    def calculate_translation_progress_in_percents(self, step):
+        Returns:
+            list: A list with the sequence numbers of each chunk.
         """
-        Calculates the progress when individual chunks are translated and pings the update_progress_bar
-        method in gui.py
-        :param step: this much is added to the progress bar progress with each chunk being translated
+        first_seqs = [chunk.split()[0] if chunk.split() else None for chunk in chunks]
+        groups = []
+        index = 0
+        for chunk_index in range(len(chunks)):
+            next_first_seq = first_seqs[chunk_index + 1] if chunk_index + 1 < len(chunks) else None
+            group = []
+            while index < len(sequence_numbers) and (not group or sequence_numbers[index] != next_first_seq):
+                group.append(sequence_numbers[index])
+                index += 1
+            groups.append(group)
+        return groups
+
+    @staticmethod
+    def split_translated_cues(translated_chunks, chunk_sequence_numbers, lookahead=3):
         """
-        self._percentage_of_translation_complete += step
+        Splits translated chunks back into the text of the individual cues.
+
+        Every chunk is split on its own, so a damaged chunk doesn't affect the others. Only the expected
+        sequence numbers start a new cue. If the translation changed or dropped a sequence number, the next
+        few expected numbers are matched as well, so the split picks up again. Cues whose number was not
+        found, and the cue before them (which took their text), are left out of the result. So are both
+        cues around a sequence number that occurs again before the next expected one, since a number in the
+        text (e.g. 'Wait 3 minutes') can't be told apart from the boundary. Cues left out are translated one
+        by one afterwards.
+
+        Args:
+            translated_chunks (list): List of translated subtitle chunks.
+            chunk_sequence_numbers (list): The sequence numbers of each chunk, see group_sequence_numbers.
+            lookahead (int): How many expected sequence numbers are matched at once.
 
-        from gui import SubtitleTranslatorGUI
-        gui_instance = SubtitleTranslatorGUI.get_instance()
-        if gui_instance:
-            gui_instance.update_progress_bar(int(self._percentage_of_translation_complete))
+        Returns:
+            dict: Sequence numbers as keys and translated cue text as values.
+        """
+        translations = {}
+        for translated_chunk, sequence_numbers in zip(translated_chunks, chunk_sequence_numbers):
+            words = translated_chunk.split()
+            # Tolerates punctuation the translation may have attached to the number (e.g. '5.')
+            numbers = [word.strip(".,:;!?()[]\"'") for word in words]
+            next_index = 0
+            current_seq = None
+            ambiguous = set()
+            for position, word in enumerate(words):
+                number = numbers[position]
+                if number in sequence_numbers[next_index:next_index + lookahead]:
+                    found_index = sequence_numbers.index(number, next_index)
+                    if found_index > next_index and current_seq is not None:
+                        # The skipped cues' text ended up in the previous cue, it can't be trusted either
+                        ambiguous.add(current_seq)
+                    following = sequence_numbers[found_index + 1:found_index + 1 + lookahead]
+                    for later_number in numbers[position + 1:]:
+                        if later_number in following:
+                            break
+                        if later_number == number:
+                            # The same number shows up again before the next cue, one of them is cue text
+                            ambiguous.update(seq for seq in (current_seq, number) if seq is not None)
+                            break
+                    current_seq = number
+                    translations[current_seq] = []
+                    next_index = found_index + 1
+                elif current_seq is not None:
+                    translations[current_seq].append(word)
+            if next_index < len(sequence_numbers) and current_seq is not None:
+                # Same for the last cue found when the chunk's last numbers are missing
+                ambiguous.add(current_seq)
+            for seq in ambiguous:
+                translations.pop(seq, None)
+
+        return {seq: " ".join(words) for seq, words in translations.items()}
 
-    def reassemble_subs(self, translated_chunks):
+    @staticmethod
+    def reassemble_subs(cues, translations):
         """
-        Reassembles subtitle chunks by adding sequence numbers and timestamps.
+        Reassembles subtitles from the cues and their translations by adding sequence numbers and timestamps.
 
         Args:
-           translated_chunks (list): List of translated subtitle chunks.
+           cues (list): Cues as returned by parse_cues.
+           translations (dict): Sequence numbers as keys and translated cue text as values.
 
         Returns:
            list: A list of reassembled subtitle lines with sequence numbers and timestamps.
         """
         translated_subs = []
-        for chunk in translated_chunks:
-            while not chunk == "":
-                chunk = chunk.strip()
-                words = ""
-                while chunk and not str.isdigit(chunk.split()[0]):
-                    words += chunk.split()[0] + " "
-                    chunk = " ".join(chunk.split()[1:])
-                    continue
+        for cue in cues:
+            translated_subs.append(cue["seq"])
+            translated_subs.append(cue["timestamp"])
+            translated_subs.append(translations.get(cue["seq"], ""))
+            # Blank line between cues
+            translated_subs.append("")
 
-                if chunk and str.isdigit(chunk.split()[0]):
-                    if not words == "":
-                        # append translated line
-                        words = words + "\n"
-                        translated_subs.append(words)
+        return translated_subs
 
-                    line = chunk.split()[0]
-                    # append sequence number
-                    translated_subs.append(line)
-                    #### append timestamp from dictionary
-                    translated_subs.append(self._sequence_numbers_and_timestamps[line])
-                    ####
-                    chunk = " ".join(chunk.split()[1:])
+    @staticmethod
+    def translation_record_path(output_path):
+        """
+        Returns the path of the record that stores the source cues of an output file and their translations.
+        """
+        return f"{output_path}.quicksub.json"
 
-        return translated_subs
+    @staticmethod
+    def load_translation_record(output_path, source_lang, target_lang):
+        """
+        Loads the translations recorded for a previous output, so unchanged cues can be reused.
+
+        Args:
+            output_path (str): Path of the translated output file.
+            source_lang (str): The language code for the source language (e.g., 'en').
+            target_lang (str): The language code for the target language (e.g., 'sr').
+
+        Returns:
+            dict: Source cue text as keys and translated text as values. Empty if there is no record,
+            it can't be read or it was made for other languages.
+        """
+        record_path = PATranslatorService.translation_record_path(output_path)
+        if not (os.path.exists(record_path) and os.path.exists(output_path)):
+            return {}
+        try:
+            with open(record_path, "r", encoding="utf-8") as file:
+                record = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Could not read translation record {record_path}: {e}")
+            return {}
+        if record.get("source_lang") != source_lang or record.get("target_lang") != target_lang:
+            return {}
+        # Cues whose translation failed are translated again
+        return {cue["text"]: cue["translation"] for cue in record.get("cues", []) if cue["translation"]}
+
+    @staticmethod
+    def hash_file(file_path):
+        """
+        Returns:
+            str: The SHA-256 hex digest of the file content.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def is_output_up_to_date(input_path, output_path, target_lang):
+        """
+        Checks whether output_path already holds the translation of the current content of input_path.
+
+        Args:
+            input_path (str): Path of the source subtitle file.
+            output_path (str): Path of the translated output file.
+            target_lang (str): The language code for the target language (e.g., 'sr').
+
+        Returns:
+            bool: True if the output exists and its record was made from a source with the same content hash.
+        """
+        record_path = PATranslatorService.translation_record_path(output_path)
+        if not (os.path.exists(output_path) and os.path.exists(record_path)):
+            return False
+        try:
+            with open(record_path, "r", encoding="utf-8") as file:
+                record = json.load(file)
+            return (record.get("target_lang") == target_lang
+                    and record.get("source_hash") == PATranslatorService.hash_file(input_path))
+        except (OSError, ValueError):
+            return False
 
     @staticmethod
-    def write_to_file(content, file_path):
+    def save_translation_record(output_path, source_lang, target_lang, cues, translations, source_hash=None,
+                                bulk_writer=None):
         """
-        Writes the provided content to a specified file.
+        Stores the source cues of an output file and their translations next to the output file.
+
+        Args:
+            output_path (str): Path of the translated output file.
+            source_lang (str): The language code for the source language (e.g., 'en').
+            target_lang (str): The language code for the target language (e.g., 'sr').
+            cues (list): Cues as returned by parse_cues.
+            translations (dict): Sequence numbers as keys and translated cue text as values.
+            source_hash (str): Hash of the source file, as returned by hash_file.
+            bulk_writer (BulkWriter): Optional, queues the record instead of writing it right away.
+        """
+        record = {
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "source_hash": source_hash,
+            "cues": [{"text": cue["text"], "translation": translations.get(cue["seq"], "")} for cue in cues],
+        }
+        record_path = PATranslatorService.translation_record_path(output_path)
+        data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        try:
+            if bulk_writer:
+                bulk_writer.add_bytes(record_path, data)
+            else:
+                SubtitleWriter.write_bytes(record_path, data)
+        except OSError as e:
+            print(f"Could not write translation record: {e}")
+
+    @staticmethod
+    def write_to_file(content, file_path, bulk_writer=None):
+        """
+        Writes the provided content to a specified file. The lines are joined and written at once to a
+        temporary file that is renamed into place, so a failure never leaves a truncated file.
 
         Args:
             content (list): A list of strings (lines of text) to be written to the file.
             file_path (str): The path where the file should be saved, including the filename and extension.
+            bulk_writer (BulkWriter): Optional, queues the file to be written together with other batch outputs.
 
         Raises:
-           Exception: If an error occurs during the file writing process (e.g., file permission issues).
+           OSError: If an error occurs during the file writing process (e.g., file permission issues). Files
+               queued in a BulkWriter report their errors through BulkWriter.get_error instead.
         """
-        try:
-            with open(file_path, 'w', encoding='utf-8') as file:
-                for line in content:
-                    line = line + "\n"
-                    file.write(line)
+        if bulk_writer:
+            bulk_writer.add_lines(file_path, content)
+        else:
+            SubtitleWriter.write_lines(file_path, content)
 
-        except Exception as e:
-            print(f"Error writing to file: {e}")
+    def profile_stage(self, name):
+        """
+        Returns a context that times a stage of the job when profiling, and does nothing otherwise.
+        """
+        return self._profiler.stage(name) if self._profiler else nullcontext()
 
     def process_translation(self):
-        # get the raw subtitle lines from source file
-        unprocessed_subtitle = self.read_file(self._path)
-        # process subtitles, removing timestamps from subtitles + getting ready for later reassembly
-        processed_subtitle = self.process_subtitles(unprocessed_subtitle)
-        #create chunks
-        chunks = self.create_chunks(processed_subtitle)
+        if not self._profile:
+            self.run_translation()
+            return
+        with JobProfiler(self._dir_path) as self._profiler:
+            self.run_translation()
+
+    def run_translation(self):
+        with self.profile_stage("read"):
+            # hashed before reading, so a file that changes while it's translated never looks up to date afterwards
+            source_hash = self.hash_file(self._path)
+            # get the raw subtitle lines from source file
+            unprocessed_subtitle = self.read_file(self._path)
+            # parse the subtitles into cues, the timestamps are kept aside for later reassembly
+            cues = self.parse_cues(unprocessed_subtitle)
+
+        with self.profile_stage("detect"):
+            # detect the source language from a sample of the cues if the user didn't pick one
+            auto_source = self._source_lang == LanguageDetector.AUTO
+            if auto_source:
+                detected_lang = LanguageDetector.detect_language([cue["text"] for cue in cues])
+                if detected_lang is None:
+                    # Lingva detects the language itself for the "auto" source, per chunk
+                    print("Could not detect the source language, leaving it to the translation service.")
+                else:
+                    print(f"Detected source language: {detected_lang}")
+                    self._source_lang = detected_lang
+
+            translations = {}
+            if self._source_lang == self._target_lang:
+                # the file is already in the target language, nothing has to be sent
+                LanguageRegistry.get_instance().validate_pair(LanguageDetector.AUTO, self._target_lang)
+                translations = {cue["seq"]: cue["text"] for cue in cues}
+            else:
+                # fail right away on an unsupported language pair, instead of once per chunk
+                LanguageRegistry.get_instance().validate_pair(self._source_lang, self._target_lang)
+
+        with self.profile_stage("select cues"):
+            # in incremental mode, translations of cues that didn't change since the previous output are reused
+            if self._incremental and not translations:
+                previous_translations = self.load_translation_record(self._dir_path, self._source_lang, self._target_lang)
+                for cue in cues:
+                    if cue["text"] in previous_translations:
+                        translations[cue["seq"]] = previous_translations[cue["text"]]
+                print(f"Reusing {len(translations)} of {len(cues)} cues from the previous translation.")
+
+            # cues that are already in the target language (e.g. in mixed-language files) are kept as they are,
+            # unless the detector may have mistaken the source language the user picked for the target
+            cues_to_translate = []
+            for cue in cues:
+                if cue["seq"] in translations:
+                    continue
+                detected_lang = LanguageDetector.detect(cue["text"])
+                if detected_lang == self._target_lang and (
+                        auto_source or LanguageDetector.can_tell_apart(detected_lang, self._source_lang)):
+                    translations[cue["seq"]] = cue["text"]
+                else:
+                    cues_to_translate.append(cue)
+
+        with self.profile_stage("chunk"):
+            #create chunks
+            chunks = self.create_chunks(self.cues_to_lines(cues_to_translate))
+        progress_reporter = None
+        if self._progress_callback:
+            total_chars = sum(len(chunk.strip()) for chunk in chunks)
+            progress_reporter = ProgressReporter(total_chars, len(chunks), self._progress_callback)
         print("Translation starting now!")
         start_time = time.time()
-        translated_chunks = self.translate_chunks(chunks, self._source_lang, self._target_lang)
+        with self.profile_stage("translate"):
+            translated_chunks = self.translate_chunks(chunks, self._source_lang, self._target_lang, progress_reporter,
+                                                      self._cancellation_token, self._profiler)
+            chunk_sequence_numbers = self.group_sequence_numbers(chunks, [cue["seq"] for cue in cues_to_translate])
+            translations.update(self.split_translated_cues(translated_chunks, chunk_sequence_numbers))
+
+            # cues the split couldn't find (the translation mangled their number) are translated one by one
+            missing_cues = [cue for cue in cues_to_translate if cue["seq"] not in translations and cue["text"].strip()]
+            if missing_cues:
+                print(f"Warning: {len(missing_cues)} cues lost their sequence number in translation, "
+                      f"translating them one by one.")
+                cue_texts = [self.line_cleanup(cue["text"]) for cue in missing_cues]
+                cue_translations = self.translate_chunks(cue_texts, self._source_lang, self._target_lang,
+                                                         cancellation_token=self._cancellation_token,
+                                                         profiler=self._profiler)
+                for cue, translation in zip(missing_cues, cue_translations):
+                    translations[cue["seq"]] = translation
         print("Translation done!")
         end_time = time.time()
         print(f"Start time: {start_time}")
         print(f"End time: {end_time}")
         print(f"Elapsed: {end_time - start_time}")
-        reassembled_chunks = self.reassemble_subs(translated_chunks)
-        self.write_to_file(reassembled_chunks, self._dir_path)
\ No newline at end of file
+        print(f"Backend stats: {self.get_backend_stats()}")
+        with self.profile_stage("write"):
+            reassembled_subs = self.reassemble_subs(cues, translations)
+            self.write_to_file(reassembled_subs, self._dir_path, self._bulk_writer)
+            self.save_translation_record(self._dir_path, self._source_lang, self._target_lang, cues, translations,
+                                         source_hash, self._bulk_writer)
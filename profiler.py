@@ -0,0 +1,171 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from subtitle_writer import SubtitleWriter
+
+class JobProfiler:
+    """
+    Opt-in profiling of one translation job. Used as a context manager around the job, it records:
+
+        - per-stage wall time and CPU time of the job thread (see stage()),
+        - time spent waiting on the network, summed over the parallel chunk requests,
+        - a cProfile of the job thread, written as a report sorted by cumulative time. Only one cProfile can
+          be active per process (Python 3.12+), so jobs profiled at the same time as another one only get
+          the stack samples,
+        - stack samples of the job thread and its request threads, written as collapsed stacks that
+          flamegraph.pl or speedscope can read.
+
+    The reports are written next to the output file as <output>.profile.log and <output>.collapsed, names
+    that are not picked up as subtitle files by a watched folder or a batch queue. Jobs that fail or are
+    cancelled don't write reports.
+
+    Args:
+        output_path (str): Path of the translated output file.
+        sample_interval (float): Seconds between two stack samples.
+    """
+
+    # Held by the job whose cProfile is active
+    _cprofile_lock = threading.Lock()
+
+    def __init__(self, output_path, sample_interval=0.005):
+        self._output_path = output_path
+        self._sample_interval = sample_interval
+
+        self._stages = []
+        self._network_wait = 0.0
+        self._network_requests = 0
+        self._samples = Counter()
+        self._thread_ids = set()
+        self._lock = threading.Lock()
+
+        self._profile = cProfile.Profile()
+        self._profile_enabled = False
+        self._sampler = None
+        self._stopped = threading.Event()
+        self._start_wall = 0.0
+        self._start_cpu = 0.0
+        self._wall_time = 0.0
+        self._cpu_time = 0.0
+
+    def __enter__(self):
+        self.register_thread()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        if JobProfiler._cprofile_lock.acquire(blocking=False):
+            try:
+                self._profile.enable()
+                self._profile_enabled = True
+            except ValueError:
+                # Another profiler (not one of ours) is already active in this process
+                JobProfiler._cprofile_lock.release()
+        # Started last, nothing can fail after it and leave the sampler running
+        self._sampler = threading.Thread(target=self.sample_stacks, name="QuickSubProfiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._profile_enabled:
+            self._profile.disable()
+            JobProfiler._cprofile_lock.release()
+        self._wall_time = time.perf_counter() - self._start_wall
+        self._cpu_time = time.process_time() - self._start_cpu
+        self._stopped.set()
+        self._sampler.join()
+        if exc_type is not None:
+            print("Job did not finish, no profile written.")
+            return
+        try:
+            self.write_reports()
+        except OSError as e:
+            print(f"Could not write the profile: {e}")
+
+    def register_thread(self):
+        """
+        Adds the calling thread to the sampled threads. Used as initializer of the request thread pool.
+        """
+        with self._lock:
+            self._thread_ids.add(threading.get_ident())
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures the wall time and the job thread's CPU time of a stage of the job.
+
+        Args:
+            name (str): Name of the stage in the report.
+        """
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self._stages.append((name, time.perf_counter() - start_wall, time.thread_time() - start_cpu))
+
+    def record_network_wait(self, seconds):
+        """
+        Adds the time one chunk spent waiting for its translation request.
+        """
+        with self._lock:
+            self._network_wait += seconds
+            self._network_requests += 1
+
+    def sample_stacks(self):
+        """
+        Samples the stacks of the registered threads until the profiler is stopped. Translation requests run
+        on these threads too (shared requests run on the thread of the job that asked first), idle pool
+        threads are left out.
+        """
+        while not self._stopped.wait(self._sample_interval):
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = list(self._thread_ids)
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                if frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith("thread.py"):
+                    continue  # An idle pool thread waiting for work, it would only bury the real stacks
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._samples[";".join(reversed(stack))] += 1
+
+    def write_reports(self):
+        """
+        Writes the profile report and the collapsed stacks next to the output file.
+        """
+        lines = [
+            f"QuickSub profile of {self._output_path}",
+            "",
+            f"Total wall time: {self._wall_time:.3f}s",
+            f"Total CPU time (process): {self._cpu_time:.3f}s",
+            f"Network wait: {self._network_wait:.3f}s over {self._network_requests} requests "
+            "(summed over parallel requests)",
+            "",
+            f"{'Stage':<20}{'Wall (s)':>12}{'CPU (s)':>12}",
+        ]
+        for name, wall, cpu in self._stages:
+            lines.append(f"{name:<20}{wall:>12.3f}{cpu:>12.3f}")
+        lines.append("")
+        if self._profile_enabled:
+            lines.append("cProfile of the job thread, sorted by cumulative time:")
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(40)
+            lines.append(stream.getvalue())
+        else:
+            lines.append("No cProfile, another profiler (e.g. of a parallel job) was active. See the collapsed stacks.")
+
+        SubtitleWriter.write_lines(f"{self._output_path}.profile.log", lines)
+        SubtitleWriter.write_lines(f"{self._output_path}.collapsed",
+                                   [f"{stack} {count}" for stack, count in self._samples.most_common()])
+        print(f"Profile written to {self._output_path}.profile.log")
@@ -0,0 +1,54 @@
+import threading
+import time
+
+class ProgressReporter:
+    """
+    Collects translation progress from the (possibly concurrent) chunk requests and forwards it to a
+    callback at most once per `min_interval` seconds, so a fast backend doesn't flood the Qt event loop.
+    Progress is counted in characters, so there is no rounding drift.
+
+    Args:
+        total_chars (int): Number of characters that will be translated.
+        total_chunks (int): Number of chunks that will be translated.
+        callback (callable): Called with (chars_done, total_chars, chunks_done, total_chunks, throughput, eta),
+            throughput in characters per second and eta in seconds. It must not block.
+        min_interval (float): Minimum number of seconds between two callback calls.
+    """
+
+    def __init__(self, total_chars, total_chunks, callback, min_interval=0.1):
+        self._total_chars = total_chars
+        self._total_chunks = total_chunks
+        self._callback = callback
+        self._min_interval = min_interval
+
+        self._chars_done = 0
+        self._chunks_done = 0
+        self._start_time = time.monotonic()
+        self._last_report_time = 0.0
+        self._lock = threading.Lock()
+
+    def chunk_done(self, chars):
+        """
+        Records a translated chunk and reports the progress if the throttle interval has passed.
+        The last chunk is always reported so the GUI ends at 100%.
+
+        Args:
+            chars (int): Number of characters in the translated chunk.
+        """
+        with self._lock:
+            self._chars_done += chars
+            self._chunks_done += 1
+            now = time.monotonic()
+            finished = self._chunks_done >= self._total_chunks
+            if not finished and now - self._last_report_time < self._min_interval:
+                return
+            self._last_report_time = now
+
+            elapsed = max(now - self._start_time, 1e-6)
+            throughput = self._chars_done / elapsed
+            remaining = self._total_chars - self._chars_done
+            eta = remaining / throughput if throughput > 0 else 0.0
+            # Called under the lock, so reports arrive in order and the final one is always the last one.
+            # The callback must return quickly (emitting a queued Qt signal does).
+            self._callback(self._chars_done, self._total_chars, self._chunks_done, self._total_chunks,
+                           throughput, eta)
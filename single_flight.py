@@ -0,0 +1,106 @@
+import threading
+import time
+
+from cancellation_token import TranslationCancelled
+
+class SingleFlight:
+    """
+    Makes concurrent callers asking for the same key share one call. The call runs on the thread of the
+    caller that started it, the others wait for its result with their own cancellation token. A waiter that
+    is paused or cancelled only stops waiting itself, the call goes on for the others. The call pauses when
+    the caller running it is paused and nobody else waits for it, and it is abandoned once every caller
+    has been cancelled, so no work is done for nobody.
+    """
+
+    class _Call:
+        def __init__(self, cancellation_token):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+            # Callers still interested in the result, including the one running the call
+            self.waiters = 1
+            self.leader_token = cancellation_token
+            self.leader_left = False
+            self.abandoned = False
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, cancellation_token=None):
+        """
+        Runs function() unless a call for the same key is already in flight, in which case its result is shared.
+
+        Args:
+            key: Hashable key identifying the call.
+            function (callable): The call to make. It gets a single argument, a checkpoint to call before every
+                expensive step: it blocks while the call is paused and raises TranslationCancelled once the
+                call has been abandoned.
+            cancellation_token (CancellationToken): Optional, token of the caller. A waiting caller stops
+                waiting when it is cancelled and blocks while it is paused.
+
+        Returns:
+            The result of the call.
+
+        Raises:
+            The exception raised by the call, or TranslationCancelled if the caller was cancelled.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = SingleFlight._Call(cancellation_token)
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+        if leader:
+            return self.run_call(key, call, function)
+
+        try:
+            while not call.done.wait(0.2):
+                if cancellation_token:
+                    cancellation_token.checkpoint()
+        except BaseException:
+            with self._lock:
+                call.waiters -= 1
+            raise
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def run_call(self, key, call, function):
+        try:
+            call.result = function(lambda: self.checkpoint(key, call))
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def checkpoint(self, key, call):
+        """
+        Blocks while the caller running the call is paused and nobody else waits for it, raises once nobody
+        waits anymore. The caller running the call leaves it once its token is cancelled, an abandoned call
+        is removed right away so later callers start a new one.
+
+        Raises:
+            TranslationCancelled: If the call has been abandoned.
+        """
+        while True:
+            with self._lock:
+                if not call.leader_left and call.leader_token and call.leader_token.is_cancelled():
+                    call.leader_left = True
+                    call.waiters -= 1
+                if call.waiters == 0 and not call.abandoned:
+                    call.abandoned = True
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                if call.abandoned:
+                    raise TranslationCancelled()
+                if call.waiters > 1 or not call.leader_token or not call.leader_token.is_paused():
+                    return
+            time.sleep(0.2)
@@ -0,0 +1,162 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+
+class SubtitleWriter:
+    """
+    Writes output files in one piece: the lines are joined into a single buffer and written with one
+    write call to a temporary file in the target directory, which is then renamed into place. A failed
+    write never leaves a truncated output file behind.
+    """
+
+    @staticmethod
+    def lines_to_bytes(lines):
+        """
+        Joins lines into the encoded file content, every line ending with a newline.
+        """
+        return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    @staticmethod
+    def write_lines(file_path, lines):
+        """
+        Writes the lines to the file atomically.
+
+        Args:
+            file_path (str): The path where the file should be saved, including the filename and extension.
+            lines (list): A list of strings (lines of text) to be written to the file.
+
+        Raises:
+            OSError: If the file can't be written. The previous file, if any, is left untouched.
+        """
+        SubtitleWriter.write_bytes(file_path, SubtitleWriter.lines_to_bytes(lines))
+
+    @staticmethod
+    def write_bytes(file_path, data, fsync=True):
+        """
+        Writes the data to a temporary file next to file_path with a single write and renames it into place.
+
+        Args:
+            file_path (str): The path of the file.
+            data (bytes): The complete file content.
+            fsync (bool): Flush the data to disk before the rename. Bulk writes skip it per file.
+
+        Raises:
+            OSError: If the file can't be written.
+        """
+        dir_path = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(dir=dir_path, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb", buffering=0) as file:
+                view = memoryview(data)
+                while view:
+                    # A single call in practice, loop only for partial writes
+                    written = file.write(view)
+                    view = view[written:]
+                if fsync:
+                    os.fsync(file.fileno())
+            # mkstemp creates the file readable by the owner only, keep the mode of the file being replaced
+            mode = stat.S_IMODE(os.stat(file_path).st_mode) if os.path.exists(file_path) else 0o644
+            os.chmod(temp_path, mode)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+class BulkWriter:
+    """
+    Collects output files of batch runs and writes them together once enough data is pending or the last
+    write was a while ago, without a per-file fsync. Call flush() (or use it as a context manager) when the
+    batch is done.
+    Write errors are kept per file, so callers can tell which of their files were not written.
+
+    Args:
+        max_pending_files (int): Pending files that trigger a flush.
+        max_pending_bytes (int): Pending bytes that trigger a flush.
+        max_pending_seconds (float): A file added this long after the last flush triggers a flush, so finished
+            files of a long batch reach the disk without waiting for the whole batch.
+    """
+
+    def __init__(self, max_pending_files=64, max_pending_bytes=8 * 1024 * 1024, max_pending_seconds=5.0):
+        self._max_pending_files = max_pending_files
+        self._max_pending_bytes = max_pending_bytes
+        self._max_pending_seconds = max_pending_seconds
+        self._last_flush_time = time.monotonic()
+        self._pending = {}
+        self._pending_bytes = 0
+        # Files taken out of _pending by a flush that is still writing them
+        self._writing = set()
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def add_lines(self, file_path, lines):
+        """
+        Queues the lines to be written to file_path. A later add for the same path replaces the earlier one.
+        Errors of a flush triggered here are kept, see get_error.
+        """
+        self.add_bytes(file_path, SubtitleWriter.lines_to_bytes(lines))
+
+    def add_bytes(self, file_path, data):
+        with self._lock:
+            previous = self._pending.pop(file_path, b"")
+            self._pending[file_path] = data
+            self._pending_bytes += len(data) - len(previous)
+            self._errors.pop(file_path, None)
+            full = (len(self._pending) >= self._max_pending_files or self._pending_bytes >= self._max_pending_bytes
+                    or time.monotonic() - self._last_flush_time >= self._max_pending_seconds)
+        if full:
+            try:
+                self.flush()
+            except OSError:
+                pass  # The batch may hold files of other jobs, every job checks its own files with get_error
+
+    def is_pending(self, file_path):
+        """
+        Returns:
+            bool: True if the file is queued or still being written.
+        """
+        with self._lock:
+            return file_path in self._pending or file_path in self._writing
+
+    def get_error(self, file_path):
+        """
+        Returns:
+            OSError: The error the last write of the file failed with, or None.
+        """
+        with self._lock:
+            return self._errors.get(file_path)
+
+    def flush(self):
+        """
+        Writes every pending file atomically.
+
+        Raises:
+            OSError: The first write error. The other pending files are still written.
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._pending_bytes = 0
+            self._writing.update(pending)
+            self._last_flush_time = time.monotonic()
+
+        errors = []
+        for file_path, data in pending.items():
+            try:
+                SubtitleWriter.write_bytes(file_path, data, fsync=False)
+            except OSError as e:
+                errors.append(e)
+                with self._lock:
+                    self._errors[file_path] = e
+            with self._lock:
+                self._writing.discard(file_path)
+        if errors:
+            raise errors[0]
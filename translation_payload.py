@@ -1,16 +1,16 @@
+from language_registry import LanguageRegistry
+from language_detector import LanguageDetector
+
 class TranslationPayload:
 
-    def __init__(self, path, dir_path, source_lang, target_lang):
+    def __init__(self, path, dir_path, source_lang, target_lang, incremental=False):
         self._file_path = path
         self._dir_path = dir_path
+        # Re-translate only the cues that changed since the previous output
+        self._incremental = incremental
         self._source_lang = self.map_languages(source_lang)
         self._target_lang = self.map_languages(target_lang)
 
-        self._language_map = {
-            "English" : "en",
-            "Српски" : "sr"
-        }
-
     def get_path(self):
         return self._file_path
 
@@ -23,11 +23,12 @@ class TranslationPayload:
     def get_target_lang(self):
         return self._target_lang
 
+    def is_incremental(self):
+        return self._incremental
+
     @staticmethod
     def map_languages(user_friendly_lang_form):
-        if user_friendly_lang_form == "English":
-            return "en"
-        elif user_friendly_lang_form == "Српски":
-            return "sr"
-        else:
-            return "unknown"
\ No newline at end of file
+        if user_friendly_lang_form == LanguageDetector.AUTO_DETECT_NAME:
+            return LanguageDetector.AUTO
+        # Names come from the language registry, the same list that fills the GUI dropdowns
+        return LanguageRegistry.get_instance().get_code(user_friendly_lang_form) or "unknown"
\ No newline at end of file
@@ -1,18 +1,42 @@
 from PyQt5.QtCore import QThread, pyqtSignal, QObject
 from pa_translator_service import PATranslatorService
+from cancellation_token import CancellationToken, TranslationCancelled
 
 class TranslationWorker(QObject):
     finished = pyqtSignal()  # Signal to notify when done
+    cancelled = pyqtSignal()  # Signal to notify when the job was cancelled
+    failed = pyqtSignal(str)  # Signal to notify when the job stopped with an error
+    # chars done, total chars, chunks done, total chunks, throughput (chars/s), eta (s)
+    progress = pyqtSignal(int, int, int, int, float, float)
 
-    def __init__(self, payload):
+    def __init__(self, payload, bulk_writer=None, profile=False):
         super().__init__()
         self._translation_payload = payload
+        self._bulk_writer = bulk_writer
+        # Writes a profile report next to the output file
+        self._profile = profile
+        self._cancellation_token = CancellationToken()
+
+    def cancel(self):
+        self._cancellation_token.cancel()
+
+    def pause(self):
+        self._cancellation_token.pause()
+
+    def resume(self):
+        self._cancellation_token.resume()
 
     def run(self):
         try:
-            # init translator service
-            service = PATranslatorService(payload=self._translation_payload)
+            # init translator service, progress is emitted as a signal so the GUI updates on its own thread
+            service = PATranslatorService(payload=self._translation_payload, progress_callback=self.progress.emit,
+                                          cancellation_token=self._cancellation_token, bulk_writer=self._bulk_writer,
+                                          profile=self._profile)
             service.process_translation()
             self.finished.emit()
+        except TranslationCancelled:
+            print("Translation cancelled.")
+            self.cancelled.emit()
         except Exception as e:
-            print(f"Worker error: {e}")
\ No newline at end of file
+            print(f"Worker error: {e}")
+            self.failed.emit(str(e))
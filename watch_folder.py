@@ -0,0 +1,205 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # Optional, uses inotify (or the platform's equivalent) instead of polling the folder
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+from pa_translator_service import PATranslatorService
+from translation_payload import TranslationPayload
+from cancellation_token import CancellationToken, TranslationCancelled
+
+class _WatchEventHandler(FileSystemEventHandler):
+    """
+    Forwards filesystem events of the watched folder to the FolderWatcher.
+    """
+
+    def __init__(self, watcher):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._watcher.notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._watcher.notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._watcher.notify(event.dest_path)
+
+class FolderWatcher:
+    """
+    Watches a drop folder and translates every subtitle file that arrives in it.
+
+    New or changed files are picked up through filesystem events if watchdog is installed, otherwise by
+    polling the folder. A file is only processed once its size and modification time stopped changing for
+    `debounce_seconds`, so files that are still being written are not translated half-way. Up to `workers`
+    files are translated at the same time. Files whose output is up to date (same content hash as the source
+    the output was made from) are skipped.
+
+    Args:
+        watch_dir (str): The folder to watch.
+        output_dir (str): Where translated files are saved, defaults to the watched folder.
+        source_lang (str): Source language name or code, 'Auto-detect' to detect it per file.
+        target_lang (str): Target language name or code.
+        workers (int): Number of files translated at the same time.
+        debounce_seconds (float): How long a file has to stay unchanged before it's processed.
+        poll_interval (float): Seconds between two scans of the folder when polling.
+        profile (bool): Write a profile report next to every translated file.
+    """
+
+    # Extensions of the files that are translated
+    SUBTITLE_EXTENSIONS = (".srt", ".txt")
+
+    def __init__(self, watch_dir, output_dir=None, source_lang="Auto-detect", target_lang="English", workers=2,
+                 debounce_seconds=2.0, poll_interval=2.0, profile=False):
+        self._watch_dir = os.path.abspath(watch_dir)
+        self._output_dir = os.path.abspath(output_dir) if output_dir else self._watch_dir
+        self._source_lang = source_lang
+        self._target_lang = target_lang
+        self._debounce_seconds = debounce_seconds
+        self._poll_interval = poll_interval
+        self._profile = profile
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._cancellation_token = CancellationToken()
+        # Files waiting to settle: path -> (size, modification time, time of the last change)
+        self._pending = {}
+        # Files being translated right now
+        self._in_progress = set()
+        # Size and modification time of every file when it was last submitted, unchanged files are not queued again
+        self._submitted = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def is_subtitle_file(self, path):
+        """
+        Tells whether a file in the watched folder should be translated. Hidden and temporary files and the
+        outputs written by QuickSub itself (recognizable by their translation record) are left out.
+        """
+        file_name = os.path.basename(path)
+        return (file_name.lower().endswith(self.SUBTITLE_EXTENSIONS)
+                and not file_name.startswith(".")
+                and not os.path.exists(PATranslatorService.translation_record_path(path)))
+
+    def notify(self, path):
+        """
+        Registers a new or changed file. It's processed once it stops changing.
+        """
+        if not self.is_subtitle_file(path):
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._submitted.get(path) == (stat.st_size, stat.st_mtime):
+                return
+            if path not in self._pending:
+                self._pending[path] = (None, None, time.monotonic())
+
+    def scan(self):
+        """
+        Registers every subtitle file currently in the watched folder.
+        """
+        try:
+            file_names = os.listdir(self._watch_dir)
+        except OSError as e:
+            print(f"Could not read the watched folder: {e}")
+            return
+        for file_name in file_names:
+            path = os.path.join(self._watch_dir, file_name)
+            if os.path.isfile(path):
+                self.notify(path)
+
+    def check_pending(self):
+        """
+        Submits the pending files that have not changed for the debounce period.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for path, (size, modified, last_change) in list(self._pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Deleted or moved away before it settled
+                    del self._pending[path]
+                    continue
+                if (stat.st_size, stat.st_mtime) != (size, modified):
+                    self._pending[path] = (stat.st_size, stat.st_mtime, now)
+                elif now - last_change >= self._debounce_seconds and path not in self._in_progress:
+                    del self._pending[path]
+                    # An output of ours gets its record only after the file itself is written
+                    if not self.is_subtitle_file(path):
+                        continue
+                    self._submitted[path] = (size, modified)
+                    self._in_progress.add(path)
+                    self._executor.submit(self.process_file, path)
+
+    def process_file(self, path):
+        """
+        Translates one file, unless its output is already up to date.
+        """
+        # Imported here, gui.py pulls in Qt which is only needed for this helper
+        from gui import PathHandler
+
+        try:
+            output_path = PathHandler.create_output_path(path, self._output_dir, self._target_lang)
+            payload = TranslationPayload(path, output_path, self._source_lang, self._target_lang, incremental=True)
+            if PATranslatorService.is_output_up_to_date(path, output_path, payload.get_target_lang()):
+                print(f"Skipping {path}, the translation is up to date.")
+                return
+            print(f"Translating {path}...")
+            PATranslatorService(payload, cancellation_token=self._cancellation_token,
+                                profile=self._profile).process_translation()
+            print(f"Saved {output_path}")
+        except TranslationCancelled:
+            print(f"Stopped translating {path}.")
+        except Exception as e:
+            print(f"Failed to translate {path}: {e}")
+        finally:
+            with self._lock:
+                self._in_progress.discard(path)
+
+    def run(self):
+        """
+        Watches the folder until stop() is called or the process is interrupted (Ctrl+C).
+        """
+        print(f"Watching {self._watch_dir} for new subtitle files...")
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_WatchEventHandler(self), self._watch_dir, recursive=False)
+            observer.start()
+        else:
+            print("watchdog is not installed, polling the folder instead.")
+
+        # Files that were dropped while the watcher was not running
+        self.scan()
+        last_scan = time.monotonic()
+        try:
+            while not self._stopped.wait(0.5):
+                if observer is None and time.monotonic() - last_scan >= self._poll_interval:
+                    self.scan()
+                    last_scan = time.monotonic()
+                self.check_pending()
+        except KeyboardInterrupt:
+            print("Stopping the watcher...")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self._cancellation_token.cancel()
+            self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stopped.set()